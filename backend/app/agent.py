@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from . import models, database, auth, constants
+from . import search as search_index
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
@@ -96,7 +97,7 @@ def search_addresses(search: str = Query(None, min_length=2), db: Session = Depe
     if not search:
         return []
     
-    addresses = db.query(models.Address).filter(models.Address.address.ilike(f"%{search}%")).limit(10).all()
+    addresses = search_index.search_addresses(db, search, limit=10)
     
     return [
         AddressOut(address_id=addr.id, full_address=addr.address)
@@ -112,6 +113,7 @@ def add_address_to_agent(request: AddressAgentCreate, db: Session = Depends(data
         db.add(new_address)
         db.commit()
         db.refresh(new_address)
+        search_index.address_added(new_address.id, new_address.address)
         log_audit(db, user_id=current_user.id, action=constants.actionTypes['create'], target_type=constants.targetTypes['address'], target_id=new_address.id)
         # Now create AddressAgent link
         new_address_agent = models.AddressAgent(address_id=new_address.id, agent_id=request.agent_id, active=True)
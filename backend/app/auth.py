@@ -1,7 +1,9 @@
+import json
+import os
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Cookie
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app import models, database, utils
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app import models, database, utils, cache
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
@@ -16,6 +18,14 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 1
 
+# --- Principal cache configuration ---
+# Seconds a resolved user is reused for the same token subject; changes made
+# through user_management evict it right away, anything else shows up after this
+AUTH_CACHE_TTL = int(os.environ.get("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+principal_cache = cache.create_cache("principals", AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL)
+
 router = APIRouter()
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -60,7 +70,43 @@ def create_refresh_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def _cache_principal(user):
+    # Never the password hash
+    principal_cache.set(user.email, json.dumps({
+        "id": str(user.id),
+        "username": user.username,
+        "email": user.email,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "phone": user.phone,
+        "user_type_id": user.user_type_id,
+        "is_affiliate": user.is_affiliate,
+    }))
+
+def _cached_principal(db, email):
+    cached = principal_cache.get(email)
+    if cached is None:
+        return None
+    data = json.loads(cached)
+    data["id"] = UUID(data["id"])
+    if data["created_at"]:
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    user = models.User(**data)
+    # Attach as the persistent row without a SELECT; the columns left out
+    # (hashed_password) and relationships still load on first access
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+def invalidate_principal(*emails):
+    """Drops the cached users for these token subjects; call after changing or deleting a user."""
+    for email in emails:
+        if email:
+            principal_cache.delete(email)
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    # Resolved once per request, however many times the dependency is declared
+    user = getattr(request.state, "current_user", None)
+    if user is not None:
+        return user
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -73,9 +119,13 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = _cached_principal(db, email)
     if user is None:
-        raise credentials_exception
+        user = db.query(models.User).filter(models.User.email == email).first()
+        if user is None:
+            raise credentials_exception
+        _cache_principal(user)
+    request.state.current_user = user
     return user
 
 @router.post("/register", response_model=TokenAndUser)
@@ -0,0 +1,342 @@
+"""
+PDF rendering benchmarks with synthetic form payloads.
+
+Run from the backend directory:
+
+    python -m app.benchmark                              # full matrix -> benchmark_results.json
+    python -m app.benchmark --quick --output quick.json
+    python -m app.benchmark --compare last_release.json  # exit 1 on regressions
+
+Each case builds synthetic form_data for one report type, serves its images
+from a local stub HTTP server and renders it in a fresh process. Wall time is
+the median of --repeat runs, cold (nothing cached) and warm (downloads read
+from a fresh image cache filled by one earlier render, whose hit/miss counters
+are recorded). Peak memory is measured in two more runs: one
+traced with tracemalloc, and one bracketed by a reset of the kernel's RSS
+high-water mark (Linux only; the RSS figures are null elsewhere).
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from app import checkhero, constants, images
+from app.image_cache import ImageCache, IMAGE_CACHE_MAX_BYTES
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+# Metrics compared by --compare, as a fraction of the baseline value
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+
+# --- Synthetic payloads ---
+
+def _image_urls(base_url, count):
+    return [f"{base_url}/images/{i}.jpg" for i in range(count)]
+
+
+def electricity_and_smoke_payload(alarms=5, images_count=0, base_url=""):
+    return {
+        "propertyAddress": "1 Benchmark Street, Melbourne VIC 3000",
+        "reportDate": "2024-01-01",
+        "electricalSafetyCheck": True,
+        "smokeSafetyCheck": True,
+        "installationExtent": {f"Extent item {i}": i % 2 == 0 for i in range(10)},
+        "visualInspection": {f"Visual - Item {i}": i % 3 != 0 for i in range(15)},
+        "polarityTesting": {f"Polarity - Circuit {i}": True for i in range(10)},
+        "earthContinuityTesting": {f"Earth - Point {i}": True for i in range(10)},
+        "rcdTestingPassed": True,
+        "smokeAlarmsWorking": True,
+        "nextSmokeAlarmCheckDate": "2025-01-01",
+        "smokeAlarmDetails": [
+            {"voltage": "240V", "status": "Working", "location": f"Room {i}", "level": str(i % 3), "expiration": "2030"}
+            for i in range(alarms)
+        ],
+        "observation": "Synthetic observation text. " * 10,
+        "recommendation": "Synthetic recommendation text. " * 10,
+        "electricalSafetyCheckCompletedBy": "Bench Marker",
+        "licenceNumber": "12345",
+        "inspectionDate": "2024-01-01",
+        "nextInspectionDueDate": "2026-01-01",
+        "signatureDate": "2024-01-01",
+        "images": _image_urls(base_url, images_count),
+    }
+
+
+def gas_payload(appliances=2, annex=2, images_count=0, base_url=""):
+    return {
+        "propertyAddress": "1 Benchmark Street, Melbourne VIC 3000",
+        "dateOfInspection": "2024-01-01",
+        "agentName": "Bench Agent",
+        "inspectorDetails": {"inspectorName": "Bench Marker"},
+        "checksConducted": {"gasSafetyCheckStatus": "Pass"},
+        "faultsRemedialActions": [
+            {"observation": f"Fault {i}", "recommendation": "Repair", "image": ""} for i in range(5)
+        ],
+        "gasSafetyReportDetails": {"reportDate": "2024-01-01", "vbaRecordNumber": "41234"},
+        "gasInstallation": {"leakageTestResult": "Pass", "comments": ""},
+        "gasAppliances": [
+            {
+                "applianceName": f"Appliance {i}",
+                "applianceImage": "",
+                "isolationValvePresent": "Yes",
+                "electricallySafe": "Yes",
+                "adequateVentilation": "Yes",
+                "adequateClearances": "Yes",
+                "serviceInAccordanceWithAS4575": "Yes",
+                "comments": "CO Test ok. 0.00 ppm",
+            }
+            for i in range(appliances)
+        ],
+        "applianceServicingCompliance": {"servicedInAccordanceWithAS4575": True},
+        "declaration": {"applianceStatus": "Compliant", "nextGasSafetyCheckDue": "2026-01-01"},
+        "annexPhotos": [{"applianceName": f"Appliance {i}", "photoUrl": f"photo-{i}.jpg"} for i in range(annex)],
+        "images": _image_urls(base_url, images_count),
+    }
+
+
+def smoke_payload(alarms=5, appendix=2, images_count=0, base_url=""):
+    return {
+        "propertyAddress": "1 Benchmark Street, Melbourne VIC 3000",
+        "dateOfInspection": "2024-01-01",
+        "agentName": "Bench Agent",
+        "inspectorDetails": {"inspectorName": "Bench Marker"},
+        "smokeAlarmDetails": [
+            {"voltage": "240V", "status": "Working", "location": f"Room {i}", "expiration": "2030"}
+            for i in range(alarms)
+        ],
+        "imageAppendix": [{"image": f"appendix-{i}.jpg", "description": f"Appendix image {i}"} for i in range(appendix)],
+        "images": _image_urls(base_url, images_count),
+    }
+
+
+PAYLOAD_BUILDERS = {
+    constants.ELECTRICITY_AND_SMOKE_REPORT_TYPE: electricity_and_smoke_payload,
+    constants.GAS_REPORT_TYPE: gas_payload,
+    constants.SMOKE_REPORT_TYPE: smoke_payload,
+}
+
+# (name, report type, payload parameters)
+CASES = [
+    ("electricity_small", constants.ELECTRICITY_AND_SMOKE_REPORT_TYPE, {"alarms": 5}),
+    ("electricity_alarms_100", constants.ELECTRICITY_AND_SMOKE_REPORT_TYPE, {"alarms": 100}),
+    ("electricity_alarms_1000", constants.ELECTRICITY_AND_SMOKE_REPORT_TYPE, {"alarms": 1000}),
+    ("electricity_images_5", constants.ELECTRICITY_AND_SMOKE_REPORT_TYPE, {"alarms": 5, "images_count": 5}),
+    ("electricity_images_20", constants.ELECTRICITY_AND_SMOKE_REPORT_TYPE, {"alarms": 5, "images_count": 20}),
+    ("gas_small", constants.GAS_REPORT_TYPE, {"appliances": 2, "annex": 2}),
+    ("gas_appliances_100", constants.GAS_REPORT_TYPE, {"appliances": 100, "annex": 2}),
+    ("gas_appliances_1000", constants.GAS_REPORT_TYPE, {"appliances": 1000, "annex": 2}),
+    ("gas_annex_1000", constants.GAS_REPORT_TYPE, {"appliances": 2, "annex": 1000}),
+    ("gas_images_10", constants.GAS_REPORT_TYPE, {"appliances": 2, "annex": 2, "images_count": 10}),
+    ("smoke_small", constants.SMOKE_REPORT_TYPE, {"alarms": 5}),
+    ("smoke_alarms_1000", constants.SMOKE_REPORT_TYPE, {"alarms": 1000}),
+    ("smoke_alarms_5000", constants.SMOKE_REPORT_TYPE, {"alarms": 5000}),
+    ("smoke_images_10", constants.SMOKE_REPORT_TYPE, {"alarms": 5, "images_count": 10}),
+]
+
+QUICK_CASES = {"electricity_small", "electricity_images_5", "gas_small", "smoke_small"}
+
+
+# --- Stub image server ---
+
+def make_test_image(width, height):
+    """A JPEG with enough detail that it doesn't compress to nothing."""
+    from PIL import Image as PILImage
+    img = PILImage.radial_gradient("L").resize((width, height)).convert("RGB")
+    noise = PILImage.effect_noise((width, height), 64).convert("RGB")
+    img = PILImage.blend(img, noise, 0.5)
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=92)
+    return out.getvalue()
+
+
+def start_image_server(image_bytes):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(image_bytes)))
+            self.end_headers()
+            self.wfile.write(image_bytes)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# --- Measurement ---
+
+def _render_once(data, report_type, cache=None):
+    # No processed images carried over; downloads go through `cache` if given,
+    # so a run is cold unless it shares a cache with an earlier one
+    images.image_cache = cache
+    images.clear_processed_cache()
+    buffer = BytesIO()
+    checkhero.generate_pdf_dispatcher(data, report_type, buffer)
+    return buffer.tell()
+
+
+def _proc_status_bytes(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024  # reported in kB
+    return None
+
+
+def _measure_rss(render):
+    """
+    Returns (peak RSS during render(), how far that peak is above the RSS
+    before it) in bytes, or (None, None) where /proc can't provide them.
+    getrusage's ru_maxrss can't be used: it survives the fork+exec that
+    starts the worker, so it reports the parent's peak.
+    """
+    try:
+        # "5" resets VmHWM to the current RSS
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = _proc_status_bytes("VmRSS")
+    except OSError:
+        render()
+        return None, None
+    render()
+    peak = _proc_status_bytes("VmHWM")
+    if peak is None or before is None:
+        return None, None
+    return peak, peak - before
+
+
+def run_case(name, report_type, params, base_url, repeat):
+    """Runs one case. Executed in a fresh process per case."""
+    data = PAYLOAD_BUILDERS[report_type](base_url=base_url, **params)
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = _render_once(data, report_type)
+        timings.append(time.perf_counter() - started)
+
+    peak_rss, render_rss = _measure_rss(lambda: _render_once(data, report_type))
+
+    tracemalloc.start()
+    _render_once(data, report_type)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Warm runs: one render fills a fresh image cache, the timed ones read from it
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ImageCache(cache_dir, IMAGE_CACHE_MAX_BYTES)
+        _render_once(data, report_type, cache)
+        warm_timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            _render_once(data, report_type, cache)
+            warm_timings.append(time.perf_counter() - started)
+        image_cache_stats = cache.stats()
+
+    return {
+        "name": name,
+        "report_type": report_type,
+        "params": params,
+        "wall_seconds": round(statistics.median(timings), 4),
+        "wall_seconds_min": round(min(timings), 4),
+        "warm_wall_seconds": round(statistics.median(warm_timings), 4),
+        "image_cache": image_cache_stats,
+        "tracemalloc_peak_bytes": traced_peak,
+        "peak_rss_bytes": peak_rss,
+        "render_rss_bytes": render_rss,
+        "output_bytes": size,
+    }
+
+
+def _mb(value):
+    return "n/a" if value is None else f"{value / 1e6:.1f} MB"
+
+
+def compare(results, baseline_path, threshold):
+    """Returns a list of human-readable regressions against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["name"])
+        if not previous:
+            continue
+        for metric in ("wall_seconds", "warm_wall_seconds", "tracemalloc_peak_bytes", "output_bytes"):
+            old, new = previous.get(metric), result.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{result['name']}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark report PDF rendering.")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="run a small subset of cases")
+    parser.add_argument("--case", action="append", help="run only the named case (repeatable)")
+    parser.add_argument("--image-size", default="4000x3000", help="stub image size, WIDTHxHEIGHT")
+    parser.add_argument("--compare", help="previous results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    cases = CASES
+    if args.quick:
+        cases = [c for c in cases if c[0] in QUICK_CASES]
+    if args.case:
+        cases = [c for c in cases if c[0] in args.case]
+
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    server, base_url = start_image_server(make_test_image(width, height))
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for name, report_type, params in cases:
+            with ctx.Pool(processes=1) as pool:
+                result = pool.apply(run_case, (name, report_type, params, base_url, args.repeat))
+            results.append(result)
+            print(f"{name:28s} {result['wall_seconds']:8.3f}s  "
+                  f"{result['tracemalloc_peak_bytes'] / 1e6:8.1f} MB traced  "
+                  f"{_mb(result['render_rss_bytes']):>10s} rss  "
+                  f"{result['warm_wall_seconds']:8.3f}s warm ({result['image_cache']['hit_rate']:.0%} hits)  "
+                  f"{result['output_bytes'] / 1e3:9.1f} KB pdf")
+    finally:
+        server.shutdown()
+
+    import reportlab
+    output = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "reportlab": reportlab.Version,
+            "template_version": checkhero.TEMPLATE_VERSION,
+            "image_size": args.image_size,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Cache configuration ---
+# "local" keeps entries in each process (also the stand-in used in tests),
+# "redis" shares them between processes through CACHE_REDIS_URL (needs the
+# redis package), "none" disables caching.
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "local")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = {"hits": 0, "misses": 0, "sets": 0, "invalidations": 0, "evictions": 0, "expirations": 0}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.values[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.values)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class LocalCache:
+    """
+    Thread-safe in-process cache, bounded by entry count (least recently used
+    entries go first) and by a TTL per entry.
+    """
+
+    def __init__(self, name, max_entries, ttl):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._counters = _Counters()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._counters.incr("expirations")
+                entry = None
+            if entry is None:
+                self._counters.incr("misses")
+                return None
+            self._entries.move_to_end(key)
+        self._counters.incr("hits")
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters.incr("evictions")
+        self._counters.incr("sets")
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        self._counters.incr("invalidations")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        stats = self._counters.snapshot()
+        stats.update(backend="local", entries=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
+        return stats
+
+
+class RedisCache:
+    """
+    Cache shared by every process through Redis. Values must be strings; the
+    LRU bound is left to the server's maxmemory policy. Counters are per process.
+    """
+
+    def __init__(self, name, url, ttl):
+        import redis  # optional dependency, only needed with CACHE_BACKEND=redis
+
+        self.name = name
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._prefix = f"checkhero:{name}:"
+        self._counters = _Counters()
+
+    def get(self, key):
+        value = self._client.get(self._prefix + key)
+        self._counters.incr("misses" if value is None else "hits")
+        return value
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self._prefix + key, value, ex=self.ttl if ttl is None else ttl)
+        self._counters.incr("sets")
+
+    def delete(self, key):
+        self._client.delete(self._prefix + key)
+        self._counters.incr("invalidations")
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+    def stats(self):
+        stats = self._counters.snapshot()
+        stats.update(backend="redis", ttl=self.ttl)
+        return stats
+
+
+class NullCache:
+    """Caches nothing; every get is a miss."""
+
+    def __init__(self, name):
+        self.name = name
+        self._counters = _Counters()
+
+    def get(self, key):
+        self._counters.incr("misses")
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        stats = self._counters.snapshot()
+        stats.update(backend="none")
+        return stats
+
+
+_caches = {}
+
+def create_cache(name, max_entries, ttl):
+    """
+    Creates the named cache on the configured backend. Values should be
+    strings so that every backend can hold them.
+    """
+    if CACHE_BACKEND == "none":
+        cache = NullCache(name)
+    elif CACHE_BACKEND == "redis":
+        cache = RedisCache(name, CACHE_REDIS_URL, ttl)
+    else:
+        cache = LocalCache(name, max_entries, ttl)
+    _caches[name] = cache
+    return cache
+
+def all_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
@@ -3,15 +3,71 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import mm
-from reportlab.lib.utils import ImageReader
-import requests
 from io import BytesIO
-from app import constants
+import hashlib
+import json
+from app import constants, images
+
+# Bump whenever the layout of any generator changes, so stored PDFs are no
+# longer treated as up to date for their form data.
+TEMPLATE_VERSION = 2
+
+IMAGE_DRAW_WIDTH = 150 * mm
+IMAGE_DRAW_HEIGHT = 100 * mm
+
+# Tables with more data rows than this are split into chunks of
+# TABLE_CHUNK_ROWS rows. ReportLab re-measures the whole remainder of a table
+# on every page split, so one huge Table costs roughly O(rows^2) to lay out.
+# Keep TABLE_CHUNK_ROWS even so the ROWBACKGROUNDS stripes line up.
+TABLE_CHUNK_THRESHOLD = 100
+TABLE_CHUNK_ROWS = 50
+
+
+# Helper to build a header + rows table, chunked with a repeated header when large
+def build_table(table_data, col_widths, style_commands):
+    header, rows = table_data[:1], table_data[1:]
+    if len(rows) <= TABLE_CHUNK_THRESHOLD:
+        chunks = [table_data]
+    else:
+        chunks = [header + rows[i:i + TABLE_CHUNK_ROWS] for i in range(0, len(rows), TABLE_CHUNK_ROWS)]
+    tables = []
+    for chunk in chunks:
+        tbl = Table(chunk, colWidths=col_widths, repeatRows=1)
+        tbl.setStyle(TableStyle(style_commands))
+        tables.append(tbl)
+    return tables
+
+
+# Helper to append an "Attached Images" section from prefetched image bytes
+def add_attached_images(elements, image_urls, prefetched, section_style, normal_style):
+    if not image_urls:
+        return
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph("Attached Images", section_style))
+    for url in image_urls:
+        content = prefetched.get(url)
+        image = None
+        if content is not None:
+            try:
+                content = images.prepare_image(content, IMAGE_DRAW_WIDTH, IMAGE_DRAW_HEIGHT)
+                image = Image(BytesIO(content), width=IMAGE_DRAW_WIDTH, height=IMAGE_DRAW_HEIGHT)
+            except Exception as e:
+                print(f"Could not process image from {url}: {e}")
+        if image is None:
+            elements.append(Paragraph(f"<i>Could not load image from {url}</i>", normal_style))
+            continue
+        image.hAlign = 'CENTER'
+        elements.append(image)
+        elements.append(Spacer(1, 6))
 
 
 # Function to generate the PDF report
 
 def generate_report(data, filename="generated_report.pdf"):
+    # Fetch all attached images up front, concurrently
+    image_urls = data.get('images', [])
+    prefetched = images.prefetch_images(image_urls)
+
     doc = SimpleDocTemplate(
         filename,
         pagesize=A4,
@@ -59,8 +115,7 @@ def generate_report(data, filename="generated_report.pdf"):
         for key, val in items.items():
             label = key.replace(strip_key, '').strip() if strip_key else key
             table_data.append([label, "Yes" if val else "No"])
-        tbl = Table(table_data, colWidths=[120 * mm, 30 * mm])
-        tbl.setStyle(TableStyle([
+        elements.extend(build_table(table_data, [120 * mm, 30 * mm], [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -71,7 +126,6 @@ def generate_report(data, filename="generated_report.pdf"):
             ('LEFTPADDING', (0, 0), (-1, -1), 6),
             ('RIGHTPADDING', (0, 0), (-1, -1), 6),
         ]))
-        elements.append(tbl)
         elements.append(Spacer(1, 12))
 
     # Title and header
@@ -113,8 +167,7 @@ def generate_report(data, filename="generated_report.pdf"):
             alarm.get('level', ''),
             alarm.get('expiration', '')
         ])
-    alarm_tbl = Table(alarm_data, colWidths=[20 * mm, 30 * mm, 40 * mm, 20 * mm, 30 * mm])
-    alarm_tbl.setStyle(TableStyle([
+    elements.extend(build_table(alarm_data, [20 * mm, 30 * mm, 40 * mm, 20 * mm, 30 * mm], [
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
         ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -124,7 +177,6 @@ def generate_report(data, filename="generated_report.pdf"):
         ('LEFTPADDING', (0, 0), (-1, -1), 4),
         ('RIGHTPADDING', (0, 0), (-1, -1), 4),
     ]))
-    elements.append(alarm_tbl)
     elements.append(Spacer(1, 12))
 
     # Observations & recommendations
@@ -141,28 +193,15 @@ def generate_report(data, filename="generated_report.pdf"):
     elements.append(Paragraph(f"Signature Date: {data.get('signatureDate', '')}", normal_style))
 
     # Add images from S3 URLs
-    image_urls = data.get('images', [])
-    if image_urls:
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph("Attached Images", section_style))
-        for url in image_urls:
-            try:
-                response = requests.get(url, stream=True)
-                response.raise_for_status()
-                image = Image(ImageReader(BytesIO(response.content)))
-                image.drawWidth = 150 * mm
-                image.drawHeight = 100 * mm
-                image.hAlign = 'CENTER'
-                elements.append(image)
-                elements.append(Spacer(1, 6))
-            except requests.exceptions.RequestException as e:
-                print(f"Could not fetch image from {url}: {e}")
-                elements.append(Paragraph(f"<i>Could not load image from {url}</i>", normal_style))
+    add_attached_images(elements, image_urls, prefetched, section_style, normal_style)
 
     # Build PDF
     doc.build(elements)
 
 def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
+    image_urls = data.get('images', [])
+    prefetched = images.prefetch_images(image_urls)
+
     doc = SimpleDocTemplate(
         filename,
         pagesize=A4,
@@ -204,8 +243,7 @@ def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
                 f.get('recommendation', ''),
                 f.get('image', '')
             ])
-        tbl = Table(table_data, colWidths=[40*mm, 60*mm, 50*mm])
-        tbl.setStyle(TableStyle([
+        elements.extend(build_table(table_data, [40*mm, 60*mm, 50*mm], [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -213,7 +251,6 @@ def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
-        elements.append(tbl)
         elements.append(Spacer(1, 8))
 
     # Gas Safety Report Details
@@ -246,8 +283,7 @@ def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
                 a.get('serviceInAccordanceWithAS4575', ''),
                 a.get('comments', '')
             ])
-        tbl = Table(table_data, colWidths=[30*mm, 30*mm, 20*mm, 20*mm, 20*mm, 20*mm, 20*mm, 30*mm])
-        tbl.setStyle(TableStyle([
+        elements.extend(build_table(table_data, [30*mm, 30*mm, 20*mm, 20*mm, 20*mm, 20*mm, 20*mm, 30*mm], [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -255,7 +291,6 @@ def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
-        elements.append(tbl)
         elements.append(Spacer(1, 8))
 
     # Appliance Servicing Compliance
@@ -282,8 +317,7 @@ def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
                 a.get('applianceName', ''),
                 a.get('photoUrl', '')
             ])
-        tbl = Table(table_data, colWidths=[60*mm, 100*mm])
-        tbl.setStyle(TableStyle([
+        elements.extend(build_table(table_data, [60*mm, 100*mm], [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -291,10 +325,14 @@ def generate_gas_pdf(data, filename="generated_gas_report.pdf"):
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
-        elements.append(tbl)
+
+    add_attached_images(elements, image_urls, prefetched, section_style, normal_style)
     doc.build(elements)
 
 def generate_smoke_pdf(data, filename="generated_smoke_report.pdf"):
+    image_urls = data.get('images', [])
+    prefetched = images.prefetch_images(image_urls)
+
     doc = SimpleDocTemplate(
         filename,
         pagesize=A4,
@@ -330,8 +368,7 @@ def generate_smoke_pdf(data, filename="generated_smoke_report.pdf"):
                 a.get('location', ''),
                 a.get('expiration', '')
             ])
-        tbl = Table(table_data, colWidths=[30*mm, 30*mm, 60*mm, 40*mm])
-        tbl.setStyle(TableStyle([
+        elements.extend(build_table(table_data, [30*mm, 30*mm, 60*mm, 40*mm], [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -339,7 +376,6 @@ def generate_smoke_pdf(data, filename="generated_smoke_report.pdf"):
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
-        elements.append(tbl)
         elements.append(Spacer(1, 8))
 
     # Image Appendix
@@ -352,8 +388,7 @@ def generate_smoke_pdf(data, filename="generated_smoke_report.pdf"):
                 a.get('image', ''),
                 a.get('description', '')
             ])
-        tbl = Table(table_data, colWidths=[60*mm, 100*mm])
-        tbl.setStyle(TableStyle([
+        elements.extend(build_table(table_data, [60*mm, 100*mm], [
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F618D')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
             ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
@@ -361,7 +396,8 @@ def generate_smoke_pdf(data, filename="generated_smoke_report.pdf"):
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
             ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ]))
-        elements.append(tbl)
+
+    add_attached_images(elements, image_urls, prefetched, section_style, normal_style)
     doc.build(elements)
 
 
@@ -374,3 +410,18 @@ def generate_pdf_dispatcher(data, report_type, filename):
         return generate_smoke_pdf(data, filename)
     else:
         raise ValueError(f"Unknown report type: {report_type}")
+
+
+
+def render_hash(data, report_type):
+    """
+    Canonical SHA-256 of everything that determines a rendered PDF: report
+    type, form data (key order and whitespace normalized) and TEMPLATE_VERSION.
+    """
+    canonical = json.dumps(
+        {"report_type": report_type, "template_version": TEMPLATE_VERSION, "form_data": data},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -11,6 +11,10 @@ APPROVED = 'approved'
 DENIED = 'denied'
 PENDING = 'pending'
 
+RENDER_RENDERING = 'rendering'
+RENDER_READY = 'ready'
+RENDER_FAILED = 'failed'
+
 actionTypes = {
     'create': 'CREATE',
     'update': 'UPDATE',
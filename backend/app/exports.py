@@ -0,0 +1,184 @@
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app import storage
+
+# --- Export configuration ---
+ZIP_FETCH_WORKERS = int(os.environ.get("ZIP_FETCH_WORKERS", "8"))
+# Each in-flight PDF is buffered in memory up to this size, then on disk
+ZIP_SPOOL_MAX_BYTES = int(os.environ.get("ZIP_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+ZIP_CHUNK_SIZE = 64 * 1024
+# Tabular exports are flushed to the response in chunks of about this size
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=ZIP_FETCH_WORKERS, thread_name_prefix="zip-fetch")
+
+
+class _ZipSink:
+    """
+    Write-only, non-seekable stream for ZipFile. Written bytes are buffered
+    until drain() hands them to the response, so the archive is never held
+    in memory as a whole.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def seekable(self):
+        return False
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def archive_name(address, report_type_id, created_date, report_id):
+    safe_address = re.sub(r"[^A-Za-z0-9]+", "_", address or "report").strip("_")[:80]
+    date = created_date.strftime("%Y-%m-%d") if created_date else "undated"
+    return f"{safe_address}_{report_type_id}_{date}_{str(report_id)[:8]}.pdf"
+
+
+def _fetch(name, pdf_url):
+    key = storage.key_from_url(pdf_url)
+    if key is None:
+        raise ValueError(f"{pdf_url} is not in the configured storage")
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES)
+    try:
+        body = storage.open_object(key)
+        try:
+            shutil.copyfileobj(body, spool, ZIP_CHUNK_SIZE)
+        finally:
+            body.close()
+        spool.seek(0)
+        return name, spool
+    except BaseException:
+        spool.close()
+        raise
+
+
+def _fetch_concurrently(entries):
+    """
+    Yields (name, file object or None, error) as downloads complete, keeping
+    at most ZIP_FETCH_WORKERS downloads in flight.
+    """
+    entries = iter(entries)
+    pending = {}
+
+    def refill():
+        while len(pending) < ZIP_FETCH_WORKERS:
+            entry = next(entries, None)
+            if entry is None:
+                return
+            name, pdf_url = entry
+            pending[_executor.submit(_fetch, name, pdf_url)] = name
+
+    refill()
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    yield future.result() + (None,)
+                except Exception as e:
+                    yield name, None, str(e)
+            refill()
+    finally:
+        # The client went away: drop whatever is still downloading
+        for future in pending:
+            future.cancel()
+            if future.done() and not future.cancelled() and future.exception() is None:
+                future.result()[1].close()
+
+
+def stream_zip(entries):
+    """
+    Generates a ZIP archive of PDFs. `entries` yields (archive name, pdf_url)
+    and is consumed lazily. Failed downloads are listed in errors.txt.
+    """
+    sink = _ZipSink()
+    errors = []
+    seen = set()
+    # PDFs are already compressed; storing them keeps CPU use flat
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for name, fileobj, error in _fetch_concurrently(entries):
+            if error:
+                errors.append(f"{name}: {error}")
+                continue
+            if name in seen:
+                base, ext = os.path.splitext(name)
+                name = f"{base}_{len(seen)}{ext}"
+            seen.add(name)
+            with fileobj:
+                with zf.open(name, mode="w", force_zip64=True) as dest:
+                    for chunk in iter(lambda: fileobj.read(ZIP_CHUNK_SIZE), b""):
+                        dest.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+        if errors:
+            zf.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield sink.drain()
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(header, rows):
+    """Generates CSV text for `rows` (sequences matching `header`), consumed lazily."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_ndjson(header, rows):
+    """Generates one JSON object per row, keyed by `header`, consumed lazily."""
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(header, row)), default=_json_default) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    yield "".join(chunk)
@@ -0,0 +1,80 @@
+"""
+Serves the local storage backend (STORAGE_BACKEND=local) over HTTP, as S3
+would: objects are read at their public URL, and the presigned PUT URLs and
+POST policies issued by storage.presigned_upload are accepted here with the
+same limits S3 enforces (content type, exact size for PUT, at most the
+signed size for POST, expiry).
+"""
+import os
+import tempfile
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from app import storage
+
+router = APIRouter(prefix="/files", tags=["files"])
+
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+def _check(method, key, content_type, size, expires, signature):
+    try:
+        storage.backend.check_signed_upload(method, key, content_type, size, expires, signature)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+@router.get("/{key:path}")
+def read_object(key: str):
+    try:
+        path = storage.backend.file_path(key)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Not found")
+    return FileResponse(path)
+
+
+@router.put("/{key:path}")
+async def put_object(key: str, request: Request, content_type: str, size: int, expires: int, signature: str):
+    _check("PUT", key, content_type, size, expires, signature)
+    if request.headers.get("content-type") != content_type:
+        raise HTTPException(status_code=403, detail="Content-Type does not match the signed upload")
+    if request.headers.get("content-length") != str(size):
+        raise HTTPException(status_code=403, detail="Content-Length does not match the signed upload")
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as body:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > size:
+                raise HTTPException(status_code=400, detail="Body is larger than the signed size")
+            body.write(chunk)
+        if received != size:
+            raise HTTPException(status_code=400, detail="Body is smaller than the signed size")
+        body.seek(0)
+        await run_in_threadpool(storage.backend.upload_fileobj, body, key, content_type)
+    return Response(status_code=200)
+
+
+@router.post("/")
+async def post_object(request: Request):
+    form = await request.form()
+    try:
+        key = form["key"]
+        content_type = form["Content-Type"]
+        max_bytes = int(form["max_bytes"])
+        _check("POST", key, content_type, max_bytes, form["expires"], form["signature"])
+        upload = form["file"]
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="key, Content-Type, max_bytes, expires, signature and file are required")
+    if isinstance(upload, str):
+        raise HTTPException(status_code=400, detail="file must be a file upload")
+
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    if not 1 <= size <= max_bytes:
+        raise HTTPException(status_code=400, detail=f"File must be between 1 and {max_bytes} bytes")
+    upload.file.seek(0)
+    await run_in_threadpool(storage.backend.upload_fileobj, upload.file, key, content_type)
+    return Response(status_code=204)
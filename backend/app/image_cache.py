@@ -0,0 +1,174 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# --- Image cache configuration ---
+# Set IMAGE_CACHE_DIR to an empty string to disable the on-disk cache.
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "checkhero-image-cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Fraction of IMAGE_CACHE_MAX_BYTES that eviction trims the cache down to
+IMAGE_CACHE_LOW_WATERMARK = 0.9
+
+
+class CachedImage:
+    def __init__(self, content, etag=None, sha256=None):
+        self.content = content
+        self.etag = etag
+        self.sha256 = sha256
+
+
+class ImageCache:
+    """
+    Size-bounded, content-addressed image cache on local disk.
+
+    Layout under `directory`:
+      urls/<sha256(url)>.json   -> {"url", "etag", "sha256", "size"}
+      blobs/<aa>/<sha256>       -> image bytes
+
+    Blobs are shared by every URL with the same content. All writes go through
+    a temp file plus os.replace, so several worker processes can share one
+    directory; eviction is serialized with an flock on `.lock`. Blob mtimes
+    are bumped on every hit and eviction removes the least recently used
+    blobs first. Hit/miss counters are kept per process; render_engine adds
+    its workers' counts to the API process's.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes_since_check = None  # None forces a size check on first put
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "evicted_bytes": 0}
+        os.makedirs(os.path.join(directory, "urls"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+
+    # --- paths ---
+
+    def _url_path(self, url):
+        return os.path.join(self.directory, "urls", hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.directory, "blobs", sha256[:2], sha256)
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _exclusive(self):
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    # --- public API ---
+
+    def get(self, url):
+        """Returns a CachedImage for `url`, or None on a miss."""
+        try:
+            with open(self._url_path(url), "r") as f:
+                entry = json.load(f)
+            blob_path = self._blob_path(entry["sha256"])
+            with open(blob_path, "rb") as f:
+                content = f.read()
+            os.utime(blob_path)
+        except (OSError, ValueError, KeyError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return CachedImage(content, etag=entry.get("etag"), sha256=entry["sha256"])
+
+    def put(self, url, content, etag=None):
+        sha256 = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(sha256)
+        if os.path.exists(blob_path):
+            os.utime(blob_path)
+        else:
+            self._write_atomic(blob_path, content)
+        entry = {"url": url, "etag": etag, "sha256": sha256, "size": len(content)}
+        self._write_atomic(self._url_path(url), json.dumps(entry).encode("utf-8"))
+        self._count("stores")
+
+        # Scanning the directory is O(entries), so only do it after roughly
+        # a tenth of the budget has been written by this process.
+        with self._lock:
+            if self._bytes_since_check is not None:
+                self._bytes_since_check += len(content)
+                if self._bytes_since_check < self.max_bytes // 10:
+                    return CachedImage(content, etag=etag, sha256=sha256)
+            self._bytes_since_check = 0
+        self.evict()
+        return CachedImage(content, etag=etag, sha256=sha256)
+
+    def evict(self):
+        """Removes least recently used blobs until the cache is under its low watermark."""
+        with self._exclusive():
+            blobs = []
+            total = 0
+            blobs_dir = os.path.join(self.directory, "blobs")
+            for prefix in os.scandir(blobs_dir):
+                if not prefix.is_dir():
+                    continue
+                for blob in os.scandir(prefix.path):
+                    if blob.name.startswith(".tmp-"):
+                        continue
+                    try:
+                        st = blob.stat()
+                    except FileNotFoundError:
+                        continue
+                    blobs.append((st.st_mtime, st.st_size, blob.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * IMAGE_CACHE_LOW_WATERMARK)
+            blobs.sort()
+            for _, size, path in blobs:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self._count("evictions")
+                self._count("evicted_bytes", size)
+            # URL entries whose blob is gone are dropped lazily: get() treats
+            # them as misses and the next put() overwrites them.
+
+    def counters(self):
+        """The raw counters, for add_counters() in another process."""
+        with self._lock:
+            return dict(self._counters)
+
+    def add_counters(self, counters):
+        """Adds counters from another process using the same directory, e.g. a render worker."""
+        with self._lock:
+            for name, amount in counters.items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+
+    def stats(self):
+        counters = self.counters()
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+        return counters
+
+
+image_cache = ImageCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES) if IMAGE_CACHE_DIR else None
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image as PILImage, ImageOps
+from app.image_cache import image_cache
+
+# --- Image fetch configuration ---
+IMAGE_FETCH_WORKERS = int(os.environ.get("IMAGE_FETCH_WORKERS", "8"))
+IMAGE_FETCH_TIMEOUT = float(os.environ.get("IMAGE_FETCH_TIMEOUT", "10"))  # seconds, per image
+IMAGE_PREFETCH_TIMEOUT = float(os.environ.get("IMAGE_PREFETCH_TIMEOUT", "30"))  # seconds, whole report
+IMAGE_FETCH_CHUNK_SIZE = 64 * 1024
+# Report images live under write-once keys, so cached copies are served
+# without asking S3 again unless revalidation is switched on.
+IMAGE_CACHE_REVALIDATE = os.environ.get("IMAGE_CACHE_REVALIDATE", "").lower() in ("1", "true", "yes")
+
+# --- Image processing configuration ---
+IMAGE_DPI = int(os.environ.get("IMAGE_DPI", "150"))
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "80"))
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get("IMAGE_CACHE_MAX_ENTRIES", "256"))
+POINTS_PER_INCH = 72.0
+
+_lock = threading.Lock()
+_state = {"pid": None, "session": None, "executor": None}
+
+_processed_lock = threading.Lock()
+_processed_cache = OrderedDict()  # (sha256, width_px, height_px, quality) -> jpeg bytes
+
+
+def _get_pool():
+    # Sessions and executors must not be shared across a fork, so they are
+    # created lazily and re-created when we find ourselves in a new process.
+    with _lock:
+        if _state["pid"] != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=IMAGE_FETCH_WORKERS, pool_maxsize=IMAGE_FETCH_WORKERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _state["session"] = session
+            _state["executor"] = ThreadPoolExecutor(max_workers=IMAGE_FETCH_WORKERS, thread_name_prefix="image-fetch")
+            _state["pid"] = os.getpid()
+        return _state["session"], _state["executor"]
+
+
+def fetch_image(url, timeout=IMAGE_FETCH_TIMEOUT):
+    """
+    Downloads a single image through the shared session, reading through the
+    on-disk image cache. `timeout` bounds the whole download, not just each
+    socket read.
+    """
+    cached = image_cache.get(url) if image_cache else None
+    if cached is not None and not IMAGE_CACHE_REVALIDATE:
+        return cached.content
+
+    headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else {}
+    session, _ = _get_pool()
+    deadline = time.monotonic() + timeout
+    with session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+        if response.status_code == 304 and cached is not None:
+            return cached.content
+        response.raise_for_status()
+        chunks = []
+        for chunk in response.iter_content(IMAGE_FETCH_CHUNK_SIZE):
+            if time.monotonic() > deadline:
+                raise requests.exceptions.Timeout(f"Timed out after {timeout}s fetching {url}")
+            chunks.append(chunk)
+        content = b"".join(chunks)
+        etag = response.headers.get("ETag")
+
+    if image_cache:
+        try:
+            image_cache.put(url, content, etag)
+        except OSError as e:
+            print(f"Could not cache image from {url}: {e}")
+    return content
+
+
+def prefetch_images(urls, timeout=IMAGE_PREFETCH_TIMEOUT):
+    """
+    Fetches all `urls` concurrently and returns {url: bytes or None}.
+    Images that fail or are still pending when `timeout` expires map to None.
+    """
+    urls = [url for url in dict.fromkeys(urls or []) if url]
+    if not urls:
+        return {}
+    _, executor = _get_pool()
+    futures = {url: executor.submit(fetch_image, url) for url in urls}
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+    for url, future in futures.items():
+        if not future.done():
+            future.cancel()
+            print(f"Timed out fetching image from {url}")
+            results[url] = None
+            continue
+        try:
+            results[url] = future.result()
+        except requests.exceptions.RequestException as e:
+            print(f"Could not fetch image from {url}: {e}")
+            results[url] = None
+    return results
+
+
+def clear_processed_cache():
+    with _processed_lock:
+        _processed_cache.clear()
+
+
+def _target_pixels(width_pt, height_pt, dpi):
+    return (
+        max(1, int(round(width_pt / POINTS_PER_INCH * dpi))),
+        max(1, int(round(height_pt / POINTS_PER_INCH * dpi))),
+    )
+
+
+def prepare_image(content, width_pt, height_pt, dpi=IMAGE_DPI, quality=IMAGE_JPEG_QUALITY):
+    """
+    Downsamples `content` to the pixel size it is drawn at (`width_pt` x
+    `height_pt` points at `dpi`), recompresses it as JPEG and drops EXIF data.
+    Results are cached by content hash so re-rendering a report reuses them.
+    """
+    width_px, height_px = _target_pixels(width_pt, height_pt, dpi)
+    key = (hashlib.sha256(content).hexdigest(), width_px, height_px, quality)
+    with _processed_lock:
+        cached = _processed_cache.get(key)
+        if cached is not None:
+            _processed_cache.move_to_end(key)
+            return cached
+
+    img = PILImage.open(BytesIO(content))
+    # Let the JPEG decoder scale down while decoding instead of after
+    img.draft("RGB", (width_px, height_px))
+    # Apply the EXIF orientation before the EXIF block is discarded
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img = img.convert("RGBA")
+        background = PILImage.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    if img.width > width_px or img.height > height_px:
+        img = img.resize((min(img.width, width_px), min(img.height, height_px)), PILImage.LANCZOS)
+
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    processed = out.getvalue()
+
+    with _processed_lock:
+        _processed_cache[key] = processed
+        _processed_cache.move_to_end(key)
+        while len(_processed_cache) > IMAGE_CACHE_MAX_ENTRIES:
+            _processed_cache.popitem(last=False)
+    return processed
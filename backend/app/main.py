@@ -3,9 +3,9 @@ import debugpy
 # Listen on all interfaces, port 5678
 # Uncomment the next line to pause until debugger attaches
 # debugpy.wait_for_client()
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app import models, database, auth, reports, user_management, agent, constants, audit
+from app import models, database, auth, reports, user_management, agent, constants, audit, render_engine, render_jobs, migrations, cache, stats, storage, files, images
 from app.database import SessionLocal
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
@@ -17,6 +17,7 @@ if os.environ.get("DEBUGPY_ENABLED"):
     print("⏳ Waiting for debugger attach on 0.0.0.0:5678...")
 
 models.Base.metadata.create_all(bind=database.engine)
+migrations.run_migrations(database.engine)
 
 app = FastAPI(title="CheckHero Backend API")
 
@@ -26,6 +27,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 def create_initial_user_types():
@@ -60,12 +62,45 @@ def create_initial_report_types():
 create_initial_user_types()
 create_initial_report_types()
 
+@app.on_event("startup")
+def resume_render_jobs():
+    render_jobs.resume_pending()
+    stats.start_reconciler()
+
+@app.on_event("shutdown")
+def shutdown_render_engine():
+    stats.stop_reconciler()
+    render_jobs.shutdown()
+    render_engine.shutdown()
+    storage.shutdown()
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(reports.router, prefix="/reports", tags=["reports"])
 app.include_router(user_management.router, prefix="/users", tags=["users"]) # This now includes the admin routes
 app.include_router(agent.router, prefix="/agent", tags=["agent"])
 app.include_router(audit.router)
+if storage.STORAGE_BACKEND == "local":
+    app.include_router(files.router)
+
+
+@app.get("/metrics/cache", tags=["metrics"])
+def cache_metrics(current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Hit rates and sizes of the response caches in this process, plus the
+    on-disk image cache as used by this process's render workers.
+    """
+    if current_user.user_type_id != constants.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can view metrics.")
+    stats = cache.all_stats()
+    stats["image_cache"] = images.image_cache.stats() if images.image_cache else None
+    return stats
 
+@app.get("/metrics/storage", tags=["metrics"])
+def storage_metrics(current_user: models.User = Depends(auth.get_current_user)):
+    """Upload counts, retries and latency percentiles in this process."""
+    if current_user.user_type_id != constants.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can view metrics.")
+    return storage.upload_stats.snapshot()
 
 @app.get("/")
 def root():
@@ -0,0 +1,126 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql.elements import TextClause
+from app import models, search
+from app.utils import load_form_data
+
+# create_all() only creates missing tables, so columns added to existing
+# models are brought in here. Every step must be idempotent: this runs on
+# every startup.
+
+def _default_clause(column):
+    default = column.server_default
+    if default is None:
+        return ""
+    arg = default.arg
+    if isinstance(arg, TextClause):
+        return f" DEFAULT {arg.text}"
+    return " DEFAULT '{}'".format(str(arg).replace("'", "''"))
+
+def add_missing_columns(engine, table):
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{_default_clause(column)}"))
+
+def add_missing_indexes(engine, table):
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+# form_data fields that get range queries (ISO dates compare correctly as text)
+FORM_DATA_EXPRESSION_INDEXES = ["nextInspectionDueDate", "nextSmokeAlarmCheckDate", "inspectionDate"]
+
+def migrate_form_data(engine):
+    """
+    Moves Report.form_data to native JSON. Older rows hold a JSON-encoded
+    string (json.dumps stored in a JSON column); they are unwrapped into real
+    objects. On Postgres the column becomes JSONB with a GIN index for
+    containment queries and expression indexes for range queries.
+    """
+    if engine.dialect.name == "postgresql":
+        column = next(c for c in inspect(engine).get_columns("reports") if c["name"] == "form_data")
+        with engine.begin() as conn:
+            if not isinstance(column["type"], JSONB):
+                conn.execute(text(
+                    "ALTER TABLE reports ALTER COLUMN form_data TYPE JSONB USING ("
+                    "CASE WHEN json_typeof(form_data) = 'string' THEN (form_data #>> '{}')::jsonb "
+                    "ELSE form_data::jsonb END)"
+                ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_reports_form_data_gin ON reports USING GIN (form_data jsonb_path_ops)"
+            ))
+            for field in FORM_DATA_EXPRESSION_INDEXES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_reports_form_{field.lower()} ON reports ((form_data ->> '{field}'))"
+                ))
+    elif engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE reports SET form_data = json_extract(form_data, '$') WHERE json_type(form_data) = 'text'"
+            ))
+
+def dedupe_address_reports(engine):
+    """
+    Keeps only the latest address_reports row per (address_id,
+    last_inspect_type_id) so the unique index can be created.
+    """
+    existing = {i["name"] for i in inspect(engine).get_indexes("address_reports")}
+    if "uq_address_reports_address_type" in existing:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "DELETE FROM address_reports WHERE id NOT IN ("
+            "SELECT id FROM (SELECT id, ROW_NUMBER() OVER ("
+            "PARTITION BY address_id, last_inspect_type_id "
+            "ORDER BY last_inspect_time DESC NULLS LAST, id) AS rn FROM address_reports) ranked "
+            "WHERE rn = 1)"
+        ))
+
+def enable_trigram_search(engine):
+    """GiST trigram indexes for search.py: substring filters plus distance-ordered scans."""
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        print(f"pg_trgm is not available, search will scan: {e}")
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_addresses_address_trgm ON addresses USING GIST (lower(address) gist_trgm_ops)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_reports_search_text_trgm ON reports USING GIST (search_text gist_trgm_ops)"
+        ))
+
+def backfill_search_text(engine, batch_size=1000):
+    """Fills Report.search_text for rows written before it existed."""
+    reports = models.Report.__table__
+    addresses = models.Address.__table__
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                reports.select().with_only_columns(reports.c.id, reports.c.form_data, addresses.c.address)
+                .select_from(reports.outerjoin(addresses, reports.c.address_id == addresses.c.id))
+                .where(reports.c.search_text.is_(None)).limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            for row in rows:
+                conn.execute(
+                    reports.update().where(reports.c.id == row.id)
+                    .values(search_text=search.report_search_text(load_form_data(row.form_data), row.address))
+                )
+
+def run_migrations(engine):
+    add_missing_columns(engine, models.Report.__table__)
+    add_missing_indexes(engine, models.Report.__table__)
+    migrate_form_data(engine)
+    dedupe_address_reports(engine)
+    add_missing_indexes(engine, models.AddressReport.__table__)
+    enable_trigram_search(engine)
+    backfill_search_text(engine)
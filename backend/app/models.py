@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Boolean
-from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Boolean, Index, JSON, text
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 import json
 from sqlalchemy.ext.declarative import declarative_base
@@ -39,24 +39,34 @@ class User(Base):
 
 class Report(Base):
     __tablename__ = "reports"
+    __table_args__ = (
+        Index("ix_reports_created_date_id", "created_date", "id"),  # keyset pagination
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True, nullable=False)
     address = relationship("Address")
     address_id = Column(UUID(as_uuid=True), ForeignKey("addresses.id"), nullable=True)
-    publisher_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    publisher_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
     publisher = relationship("User", foreign_keys=[publisher_id], back_populates="published_reports")
     created_date = Column(DateTime, nullable=False)
     review_date = Column(DateTime, nullable=True)
-    status = Column(String, default='draft')
+    status = Column(String, default='draft', index=True)
     comment = Column(String, nullable=True)
     reviewer_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
     reviewer = relationship("User", foreign_keys=[reviewer_id], back_populates="reviewed_reports")
-    form_data = Column(SQLiteJSON)
+    form_data = Column(JSON().with_variant(JSONB(), "postgresql"))  # JSONB on Postgres, JSON text elsewhere
     pdf_url = Column(String, nullable=True)
     report_type_id = Column(Integer, ForeignKey("report_types.id"))
     report_type = relationship("ReportType")
-    agent_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True, index=True)
     agent = relationship("User", foreign_keys=[agent_id], back_populates="agent_reports")
     reward = Column(Numeric, nullable=True)
+    render_status = Column(String, nullable=False, default='ready', server_default='ready')  # rendering, ready, failed
+    render_attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    render_error = Column(Text, nullable=True)
+    render_hash = Column(String(64), nullable=True, index=True)  # checkhero.render_hash of the form behind pdf_url
+    # Bumped in SQL on every UPDATE (ORM or bulk), so it is never lost to a concurrent write; feeds the ETags
+    version = Column(Integer, nullable=False, default=1, server_default='1', onupdate=text("version + 1"))
+    search_text = Column(Text, nullable=True)  # search.report_search_text; trigram-indexed on Postgres
 
 class Address(Base):
     __tablename__ = "addresses"
@@ -94,12 +104,30 @@ class WithdrawReward(Base):
 
 class AddressReport(Base):
     __tablename__ = "address_reports"
+    __table_args__ = (
+        # One row per address and inspection type; approvals upsert into it
+        Index("uq_address_reports_address_type", "address_id", "last_inspect_type_id", unique=True),
+    )
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True, nullable=False)
     address_id = Column(UUID(as_uuid=True), ForeignKey('addresses.id'), nullable=False)
     last_report_id = Column(UUID(as_uuid=True), ForeignKey('reports.id'), nullable=True)
     last_inspect_type_id = Column(Integer, ForeignKey('report_types.id'), nullable=True)
     last_inspect_time = Column(DateTime, nullable=True)
 
+class ReportStat(Base):
+    """Rollup of reports per month, status, type and agent; maintained by app.stats."""
+    __tablename__ = "report_stats"
+    __table_args__ = (
+        Index("uq_report_stats_group", "month", "status", "report_type_id", "agent_id", unique=True),
+    )
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True, nullable=False)
+    month = Column(String(7), nullable=False)  # YYYY-MM of created_date
+    status = Column(String, nullable=False)
+    report_type_id = Column(Integer, nullable=False)  # 0 when the report has none
+    agent_id = Column(UUID(as_uuid=True), nullable=False)  # stats.NO_AGENT when the report has none
+    report_count = Column(Integer, nullable=False, default=0)
+    reward_total = Column(Numeric, nullable=False, default=0)
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, index=True, nullable=False)
@@ -0,0 +1,221 @@
+"""
+Bulk PDF regeneration for existing reports.
+
+Run from the backend directory, e.g. after bumping checkhero.TEMPLATE_VERSION:
+
+    python -m app.regenerate --type 1 --status approved --since 2024-01-01 --workers 8
+    python -m app.regenerate --dry-run
+    python -m app.regenerate --resume            # continue an interrupted run
+
+Reports are streamed from the DB in keyset-ordered batches of (created_date, id),
+rendered and uploaded in parallel worker processes, and the last finished batch
+is checkpointed so an interrupted run can pick up where it stopped.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import and_, or_
+from app import models, checkhero, render_engine, storage
+from app.utils import load_form_data
+
+DEFAULT_CHECKPOINT = "regenerate.checkpoint.json"
+
+
+def regenerate_one(report_id, form_data, report_type_id, render_hash):
+    """Renders and uploads one report. Runs inside the worker processes."""
+    try:
+        with render_engine.render_pdf(form_data, report_type_id, timeout=None) as pdf:
+            pdf.seek(0, os.SEEK_END)
+            size = pdf.tell()
+            pdf.seek(0)
+            pdf_url = storage.upload_fileobj(pdf, f"reports/{render_hash}.pdf", content_type="application/pdf")
+        return {"report_id": report_id, "pdf_url": pdf_url, "render_hash": render_hash, "bytes": size, "error": None}
+    except Exception as e:
+        error = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+        return {"report_id": report_id, "pdf_url": None, "render_hash": render_hash, "bytes": 0, "error": str(error)}
+
+
+def _worker_init():
+    # Each worker process renders inline; parallelism comes from this pool.
+    render_engine.RENDER_WORKERS = 0
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value)
+
+
+def _build_query(db, args):
+    query = db.query(
+        models.Report.id,
+        models.Report.created_date,
+        models.Report.report_type_id,
+        models.Report.form_data,
+        models.Report.render_hash,
+    )
+    if args.type:
+        query = query.filter(models.Report.report_type_id.in_(args.type))
+    if args.status:
+        query = query.filter(models.Report.status.in_(args.status))
+    if args.since:
+        query = query.filter(models.Report.created_date >= args.since)
+    if args.until:
+        query = query.filter(models.Report.created_date < args.until)
+    return query
+
+
+def _next_batch(db, args, after):
+    query = _build_query(db, args)
+    if after:
+        after_date, after_id = after
+        query = query.filter(or_(
+            models.Report.created_date > after_date,
+            and_(models.Report.created_date == after_date, models.Report.id > after_id),
+        ))
+    return query.order_by(models.Report.created_date, models.Report.id).limit(args.batch_size).all()
+
+
+def _filters(args):
+    return {
+        "type": args.type,
+        "status": args.status,
+        "since": args.since.isoformat() if args.since else None,
+        "until": args.until.isoformat() if args.until else None,
+        "force": args.force,
+    }
+
+
+def _load_checkpoint(args):
+    if not args.resume or not os.path.exists(args.checkpoint):
+        return None
+    with open(args.checkpoint) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("filters") != _filters(args):
+        sys.exit(f"Checkpoint {args.checkpoint} was written for different filters: {checkpoint.get('filters')}")
+    return checkpoint
+
+
+def _save_checkpoint(args, after, totals):
+    tmp_path = args.checkpoint + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "filters": _filters(args),
+            "after": [after[0].isoformat(), str(after[1])] if after else None,
+            "totals": totals,
+            "updated_at": datetime.utcnow().isoformat(),
+        }, f)
+    os.replace(tmp_path, args.checkpoint)
+
+
+def _apply_results(db, results):
+    """Stores new pdf_urls, skipping reports whose form changed while rendering."""
+    ok = {r["report_id"]: r for r in results if r["error"] is None}
+    if not ok:
+        return
+    rows = db.query(models.Report).filter(models.Report.id.in_(list(ok.keys()))).all()
+    for db_report in rows:
+        result = ok[db_report.id]
+        current_hash = checkhero.render_hash(load_form_data(db_report.form_data) or {}, db_report.report_type_id)
+        if current_hash != result["render_hash"]:
+            continue
+        db_report.pdf_url = result["pdf_url"]
+        db_report.render_hash = result["render_hash"]
+    db.commit()
+
+
+def run(args):
+    from app.database import SessionLocal
+
+    checkpoint = _load_checkpoint(args)
+    totals = {"selected": 0, "rendered": 0, "skipped": 0, "failed": 0, "bytes": 0}
+    after = None
+    if checkpoint:
+        totals.update(checkpoint.get("totals") or {})
+        if checkpoint.get("after"):
+            after = (datetime.fromisoformat(checkpoint["after"][0]), UUID(checkpoint["after"][1]))
+        print(f"Resuming after {checkpoint.get('after')} with totals {totals}")
+
+    db = SessionLocal()
+    executor = None
+    if not args.dry_run:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+        )
+    started = time.monotonic()
+    run_totals = {"rendered": 0, "bytes": 0}
+    try:
+        while True:
+            batch = _next_batch(db, args, after)
+            db.rollback()
+            if not batch:
+                break
+            jobs = []
+            for row in batch:
+                form_data = load_form_data(row.form_data) or {}
+                render_hash = checkhero.render_hash(form_data, row.report_type_id)
+                if render_hash == row.render_hash and not args.force:
+                    totals["skipped"] += 1
+                    continue
+                jobs.append((row.id, form_data, row.report_type_id, render_hash))
+            totals["selected"] += len(batch)
+
+            if args.dry_run:
+                totals["rendered"] += len(jobs)
+            else:
+                results = list(executor.map(regenerate_one, *zip(*jobs))) if jobs else []
+                for result in results:
+                    if result["error"]:
+                        totals["failed"] += 1
+                        print(f"Report {result['report_id']} failed: {result['error']}")
+                    else:
+                        totals["rendered"] += 1
+                        totals["bytes"] += result["bytes"]
+                        run_totals["rendered"] += 1
+                        run_totals["bytes"] += result["bytes"]
+                _apply_results(db, results)
+
+            after = (batch[-1].created_date, batch[-1].id)
+            if not args.dry_run:
+                _save_checkpoint(args, after, totals)
+            elapsed = time.monotonic() - started
+            print(f"{totals['selected']} selected, {totals['rendered']} rendered, {totals['skipped']} skipped, "
+                  f"{totals['failed']} failed ({run_totals['rendered'] / elapsed if elapsed else 0:.1f} reports/s)")
+    finally:
+        if executor:
+            executor.shutdown()
+        db.close()
+
+    elapsed = time.monotonic() - started
+    summary = dict(totals)
+    summary["elapsed_seconds"] = round(elapsed, 2)
+    summary["reports_per_second"] = round(run_totals["rendered"] / elapsed, 2) if elapsed else 0.0
+    summary["bytes_per_second"] = round(run_totals["bytes"] / elapsed, 2) if elapsed else 0.0
+    summary["dry_run"] = args.dry_run
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate stored report PDFs.")
+    parser.add_argument("--type", type=int, action="append", help="report_type_id to include (repeatable)")
+    parser.add_argument("--status", action="append", help="report status to include (repeatable)")
+    parser.add_argument("--since", type=_parse_date, help="only reports created on or after this ISO date")
+    parser.add_argument("--until", type=_parse_date, help="only reports created before this ISO date")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint file")
+    parser.add_argument("--force", action="store_true", help="re-render even if render_hash is current")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be regenerated")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from io import BytesIO
+from fastapi import HTTPException
+from app import checkhero, images
+
+# --- Render engine configuration ---
+# RENDER_WORKERS=0 renders inline in the calling thread (handy with debugpy).
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", str(os.cpu_count() or 2)))
+RENDER_TIMEOUT = float(os.environ.get("RENDER_TIMEOUT", "120"))  # seconds, per job
+RENDER_MAX_TASKS_PER_CHILD = int(os.environ.get("RENDER_MAX_TASKS_PER_CHILD", "100"))
+# Rendered PDFs above this size are handed back through a temp file instead of in memory
+PDF_SPOOL_MAX_BYTES = int(os.environ.get("PDF_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+
+_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Spawned (not forked) workers so the children never inherit the
+            # parent's DB connections, sockets or threads.
+            _executor = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=RENDER_MAX_TASKS_PER_CHILD or None,
+            )
+        return _executor
+
+
+def submit(fn, *args):
+    """
+    Queues `fn(*args)` on the render pool and returns its future. Load is
+    shed before this point: render_jobs bounds its backlog and its threads
+    are the only callers, so at most RENDER_JOB_WORKERS jobs wait here.
+    """
+    return _get_executor().submit(fn, *args)
+
+
+def render_document(data, report_type):
+    """
+    Renders a report into memory. Returns the PDF bytes, or the path of a
+    temp file holding them when the PDF is larger than PDF_SPOOL_MAX_BYTES.
+    Runs inside the worker processes.
+    """
+    buffer = BytesIO()
+    checkhero.generate_pdf_dispatcher(data, report_type, buffer)
+    if buffer.tell() <= PDF_SPOOL_MAX_BYTES:
+        return buffer.getvalue()
+    with tempfile.NamedTemporaryFile(prefix="report-", suffix=".pdf", delete=False) as f:
+        f.write(buffer.getbuffer())
+        return f.name
+
+
+def _render_in_worker(data, report_type):
+    """render_document() plus the image cache counts it added in this worker process."""
+    cache = images.image_cache
+    before = cache.counters() if cache else {}
+    result = render_document(data, report_type)
+    after = cache.counters() if cache else {}
+    return result, {name: after[name] - before.get(name, 0) for name in after}
+
+
+def _open_result(result):
+    if isinstance(result, bytes):
+        return BytesIO(result)
+    f = open(result, "rb")
+    # Unlinked right away: the data stays readable until the file is closed
+    # and nothing is left behind in /tmp whatever happens next.
+    os.remove(result)
+    return f
+
+
+def _discard_result(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    result, _ = future.result()
+    if isinstance(result, str) and os.path.exists(result):
+        os.remove(result)
+
+
+def render_pdf(data, report_type, timeout=RENDER_TIMEOUT):
+    """
+    Renders a report in a worker process and returns a readable binary file
+    object positioned at the start of the PDF. Raises a 504 when the job does
+    not finish within `timeout` seconds.
+    """
+    if RENDER_WORKERS <= 0:
+        return _open_result(render_document(data, report_type))
+    future = submit(_render_in_worker, data, report_type)
+    try:
+        result, image_counts = future.result(timeout=timeout)
+    except FutureTimeoutError:
+        if not future.cancel():
+            future.add_done_callback(_discard_result)
+        raise HTTPException(status_code=504, detail="Timed out rendering the report PDF.")
+    if images.image_cache:
+        images.image_cache.add_counters(image_counts)
+    return _open_result(result)
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
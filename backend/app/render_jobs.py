@@ -0,0 +1,164 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from app import models, constants, checkhero, render_engine, storage
+from app.database import SessionLocal
+from app.utils import load_form_data, backoff_delay
+
+# --- Render job configuration ---
+RENDER_JOB_WORKERS = int(os.environ.get("RENDER_JOB_WORKERS", "4"))
+RENDER_JOB_MAX_ATTEMPTS = int(os.environ.get("RENDER_JOB_MAX_ATTEMPTS", "5"))
+RENDER_JOB_BACKOFF_BASE = float(os.environ.get("RENDER_JOB_BACKOFF_BASE", "2"))  # seconds
+RENDER_JOB_BACKOFF_MAX = float(os.environ.get("RENDER_JOB_BACKOFF_MAX", "300"))  # seconds
+# Jobs queued or running before create/update answer 503 instead of adding more
+RENDER_JOB_QUEUE_SIZE = int(os.environ.get("RENDER_JOB_QUEUE_SIZE", str(RENDER_JOB_WORKERS * 25)))
+RENDER_RETRY_AFTER = int(os.environ.get("RENDER_RETRY_AFTER", "5"))  # seconds
+
+_executor = ThreadPoolExecutor(max_workers=RENDER_JOB_WORKERS, thread_name_prefix="render-job")
+_pending = 0
+_pending_lock = threading.Lock()
+# PDFs rendered by a job whose upload failed, kept open so the retry only
+# redoes the upload: report id -> (render hash, file object)
+_rendered = {}
+
+
+def check_capacity():
+    """
+    Raises a 503 with Retry-After when RENDER_JOB_QUEUE_SIZE jobs are already
+    queued or running. Call before committing a change that will enqueue().
+    """
+    with _pending_lock:
+        full = _pending >= RENDER_JOB_QUEUE_SIZE
+    if full:
+        raise HTTPException(
+            status_code=503,
+            detail="Report rendering is busy, please retry shortly.",
+            headers={"Retry-After": str(RENDER_RETRY_AFTER)},
+        )
+
+
+def enqueue(report_id):
+    """
+    Schedules the PDF for `report_id` to be rendered and uploaded in the
+    background. Always accepted: request handlers shed load beforehand with
+    check_capacity(), and retries or resumed jobs must not be dropped.
+    """
+    global _pending
+    with _pending_lock:
+        _pending += 1
+    _executor.submit(_job, report_id)
+
+
+def _job(report_id):
+    global _pending
+    try:
+        _run(report_id)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+def _retry_later(report_id, attempts):
+    delay = backoff_delay(attempts, RENDER_JOB_BACKOFF_BASE, RENDER_JOB_BACKOFF_MAX)
+    timer = threading.Timer(delay, enqueue, args=(report_id,))
+    timer.daemon = True
+    timer.start()
+
+
+def _discard_rendered(report_id):
+    _, pdf = _rendered.pop(report_id, (None, None))
+    if pdf is not None:
+        pdf.close()
+
+
+def _render_and_upload(report_id, form_data, report_type_id, render_hash):
+    kept_hash, pdf = _rendered.pop(report_id, (None, None))
+    if pdf is not None and kept_hash != render_hash:
+        # Rendered from an older version of the form
+        pdf.close()
+        pdf = None
+    if pdf is None:
+        pdf = render_engine.render_pdf(form_data, report_type_id)
+    pdf.seek(0)
+    try:
+        # Keyed by render hash, so identical payloads always map to one object
+        pdf_url = storage.upload_fileobj(pdf, f"reports/{render_hash}.pdf", content_type="application/pdf")
+    except Exception:
+        _rendered[report_id] = (render_hash, pdf)
+        raise
+    pdf.close()
+    return pdf_url
+
+
+def _run(report_id):
+    db = SessionLocal()
+    try:
+        db_report = db.query(models.Report).filter(models.Report.id == report_id).first()
+        if not db_report or db_report.render_status != constants.RENDER_RENDERING:
+            return
+        rendered_form_data = db_report.form_data
+        report_type_id = db_report.report_type_id
+        form_data = load_form_data(rendered_form_data) or {}
+        render_hash = checkhero.render_hash(form_data, report_type_id)
+        # Any report already rendered from an identical payload has the PDF we need
+        existing = db.query(models.Report.pdf_url).filter(
+            models.Report.render_hash == render_hash,
+            models.Report.pdf_url.isnot(None)
+        ).first()
+        # Don't hold a transaction open while rendering and uploading
+        db.rollback()
+
+        error = None
+        if existing:
+            _discard_rendered(report_id)
+            pdf_url = existing.pdf_url
+        else:
+            try:
+                pdf_url = _render_and_upload(report_id, form_data, report_type_id, render_hash)
+            except Exception as e:
+                pdf_url = None
+                error = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+
+        db_report = db.query(models.Report).filter(models.Report.id == report_id).first()
+        if not db_report:
+            _discard_rendered(report_id)
+            return
+        if db_report.form_data != rendered_form_data:
+            # The form changed while we were rendering; the job queued by
+            # that update renders the newer data.
+            return
+        if error is None:
+            db_report.pdf_url = pdf_url
+            db_report.render_hash = render_hash
+            db_report.render_status = constants.RENDER_READY
+            db_report.render_error = None
+            db.commit()
+            return
+
+        db_report.render_attempts = (db_report.render_attempts or 0) + 1
+        db_report.render_error = str(error)
+        if db_report.render_attempts >= RENDER_JOB_MAX_ATTEMPTS:
+            db_report.render_status = constants.RENDER_FAILED
+            _discard_rendered(report_id)
+        db.commit()
+        print(f"Rendering report {report_id} failed (attempt {db_report.render_attempts}): {error}")
+        if db_report.render_status == constants.RENDER_RENDERING:
+            _retry_later(report_id, db_report.render_attempts)
+    finally:
+        db.close()
+
+
+def resume_pending():
+    """Re-queues reports left in the rendering state, e.g. by a restart."""
+    db = SessionLocal()
+    try:
+        pending = db.query(models.Report.id).filter(models.Report.render_status == constants.RENDER_RENDERING).all()
+    finally:
+        db.close()
+    for (report_id,) in pending:
+        enqueue(report_id)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -1,52 +1,45 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Body, Response
-from sqlalchemy.orm import Session, joinedload
-from app import models, database, checkhero, auth
-import boto3
+from fastapi import APIRouter, Depends, Query, HTTPException, Body, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_, func, update
+from sqlalchemy.orm import Session, joinedload, aliased
+from app import models, database, auth, checkhero, storage, render_jobs, exports, cache, search, stats
 from botocore.exceptions import NoCredentialsError
 from pydantic import BaseModel
 from typing import List, Optional
+import base64
+import hashlib
 import json
 import os
 import uuid
 from datetime import datetime, timezone
-from dotenv import load_dotenv
-from botocore.client import Config
 from app import constants
 from decimal import Decimal
-from app.utils import log_audit
+from app.utils import log_audit, load_form_data, upsert
 from uuid import UUID
 
 
-load_dotenv()
-
 router = APIRouter(
     dependencies=[Depends(auth.get_current_user)]
 )
 
-# --- S3 Configuration ---
-S3_BUCKET = os.environ.get("S3_BUCKET_NAME")
-AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
-AWS_REGION = os.environ.get("AWS_REGION")
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION,
-    config=Config(s3={'addressing_style': 'virtual'})
-)
+BULK_REVIEW_MAX_ITEMS = int(os.environ.get("BULK_REVIEW_MAX_ITEMS", "500"))
 
-def upload_to_s3(file_path, object_name=None):
-    if object_name is None:
-        object_name = os.path.basename(file_path)
-    try:
-        s3_client.upload_file(file_path, S3_BUCKET, object_name)
-        return f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{object_name}"
-    except NoCredentialsError:
-        raise HTTPException(status_code=500, detail="AWS credentials not available.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to upload to S3: {e}")
+# --- Upload configuration ---
+UPLOAD_CONTENT_TYPES = os.environ.get(
+    "UPLOAD_CONTENT_TYPES", "image/jpeg,image/png,image/webp,image/heic,image/heif,application/pdf"
+).split(",")
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_URL_EXPIRES = int(os.environ.get("UPLOAD_URL_EXPIRES", "3600"))  # seconds
+PRESIGNED_BATCH_MAX_FILES = int(os.environ.get("PRESIGNED_BATCH_MAX_FILES", "100"))
+# Rows fetched per round trip by the streaming exports (server-side cursor on Postgres)
+EXPORT_FETCH_SIZE = int(os.environ.get("EXPORT_FETCH_SIZE", "1000"))
+
+# --- Report cache configuration ---
+REPORT_CACHE_TTL = int(os.environ.get("REPORT_CACHE_TTL", "300"))
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", "2000"))
+
+# Serialized ReportOut JSON per report, stored with the ETag it was built for
+report_cache = cache.create_cache("reports", REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL)
 
 class ReportOut(BaseModel):
     id: UUID
@@ -67,9 +60,17 @@ class ReportOut(BaseModel):
     agent_id: Optional[UUID] = None
     agent: Optional[str] = None
     is_affiliate: Optional[bool] = None
+    render_status: Optional[str] = None
     class Config:
         orm_mode = True
 
+class RenderStatusOut(BaseModel):
+    report_id: UUID
+    render_status: str
+    render_attempts: int
+    render_error: Optional[str] = None
+    pdf_url: Optional[str] = None
+
 class ReportCreate(BaseModel):
     form_data: dict
     address: str
@@ -86,57 +87,627 @@ class ApproveReportRequest(BaseModel):
 class DeclineReportRequest(BaseModel):
     comment: Optional[str]
 
+class ReportStatsGroup(BaseModel):
+    month: Optional[str] = None
+    status: Optional[str] = None
+    report_type_id: Optional[int] = None
+    agent_id: Optional[UUID] = None
+    agent: Optional[str] = None
+    report_count: int
+    reward_total: float
+
+class ReportStatsOut(BaseModel):
+    groups: List[ReportStatsGroup]
+    report_count: int
+    reward_total: float
+
+class PresignedFile(BaseModel):
+    content_type: str
+    size: int  # bytes
+
+class PresignedBatchRequest(BaseModel):
+    files: List[PresignedFile]
+    method: str = "put"  # "put" for presigned PUT URLs, "post" for browser form POST policies
+
+class PresignedUpload(BaseModel):
+    method: str
+    upload_url: str
+    fields: Optional[dict] = None
+    public_url: str
+    content_type: str
+
+class PresignedBatchOut(BaseModel):
+    uploads: List[PresignedUpload]
+
+class BulkReviewItem(BaseModel):
+    report_id: UUID
+    action: str  # "approve" or "decline"
+    reward: Optional[float] = None
+    comment: Optional[str] = None
+
+class BulkReviewRequest(BaseModel):
+    items: List[BulkReviewItem]
+
+class BulkReviewResult(BaseModel):
+    report_id: UUID
+    ok: bool
+    status: Optional[str] = None
+    detail: Optional[str] = None
+
+class BulkReviewOut(BaseModel):
+    results: List[BulkReviewResult]
+
+class ReportZipRequest(BaseModel):
+    agent_id: Optional[UUID] = None
+    address_ids: Optional[List[UUID]] = None
+    status: Optional[List[str]] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+class ReportPage(BaseModel):
+    items: List[ReportOut]
+    next_cursor: Optional[str] = None
+
+class ReportSummaryOut(BaseModel):
+    id: UUID
+    address: Optional[str]
+    address_id: Optional[UUID]
+    report_type_id: int
+    status: str
+    created_date: Optional[datetime]
+    review_date: Optional[datetime]
+    agent_id: Optional[UUID] = None
+    agent: Optional[str] = None
+    is_affiliate: Optional[bool] = None
+    publisher_id: Optional[UUID]
+    publisher: str
+    pdf_url: Optional[str]
+    render_status: Optional[str] = None
+    reward: Optional[float] = None
+
+class ReportSummaryPage(BaseModel):
+    items: List[ReportSummaryOut]
+    next_cursor: Optional[str] = None
+
+def _report_list_options():
+    # All many-to-one, so joined eager loading keeps every listing at one query
+    return (
+        joinedload(models.Report.publisher),
+        joinedload(models.Report.reviewer),
+        joinedload(models.Report.address),
+        joinedload(models.Report.agent),
+    )
+
+def _scope_reports(query, current_user):
+    """Restricts a Report query to what `current_user` may list, or returns None."""
+    if current_user.user_type_id == constants.ADMIN:
+        return query
+    if current_user.user_type_id == constants.AGENT:
+        return query.filter(models.Report.agent_id == current_user.id)
+    if current_user.user_type_id == constants.USER:  # User (assuming they can also be publishers)
+        return query.filter(models.Report.publisher_id == current_user.id)
+    return None
+
+def _list_report_out(r):
+    form_data = None
+    if r.form_data:
+        try:
+            form_data = load_form_data(r.form_data)
+        except Exception:
+            form_data = "" if not r.form_data else r.form_data
+    return ReportOut(
+        id=r.id,
+        address=r.address.address,
+        address_id=r.address.id,
+        agent_id=r.agent.id if r.agent else None,
+        agent=r.agent.username if r.agent else None,
+        publisher=r.publisher.username if r.publisher else 'N/A',
+        publisher_id=r.publisher_id,
+        report_type_id=r.report_type_id,
+        created_date=r.created_date,
+        review_date=r.review_date,
+        status=r.status,
+        comment=r.comment,
+        reviewer=r.reviewer.username if r.reviewer else 'N/A',
+        reviewer_id=r.reviewer_id,
+        form_data=form_data,
+        pdf_url=r.pdf_url,
+        reward=r.reward,
+        is_affiliate=r.agent.is_affiliate if r.agent else None,
+        render_status=r.render_status
+    )
+
+def _encode_cursor(created_date, report_id):
+    raw = json.dumps([created_date.isoformat(), str(report_id)]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def _decode_cursor(cursor):
+    try:
+        created_date, report_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_date), UUID(report_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _etag(*values):
+    digest = hashlib.sha256(json.dumps(values, default=str).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def _conditional(request, response, etag):
+    """
+    Sets the validators on `response`. Returns a 304 response to send
+    instead if the client's If-None-Match already names this version.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def _report_row_validator(r):
+    # Joined values a listing shows that can change without the report's version moving
+    return (
+        str(r.id),
+        r.version,
+        r.address.address if r.address else None,
+        r.agent.username if r.agent else None,
+        r.agent.is_affiliate if r.agent else None,
+        r.publisher.username if r.publisher else None,
+        r.reviewer.username if r.reviewer else None,
+    )
+
+def _summary_row_validator(r):
+    return (str(r.id), r.version, r.address, r.agent, r.is_affiliate, r.publisher)
+
+def _listing_etag(request, current_user, rows, row_validator):
+    """
+    Validator for a listing: the endpoint, caller and query string, plus
+    row_validator() of every row fetched for it: id, version and the joined
+    values shown (for the paginated listings that includes the extra row that
+    decides next_cursor). Taken from the rows the listing reads anyway, so it
+    costs no query of its own.
+    """
+    params = sorted(request.query_params.multi_items())
+    return _etag(request.url.path, str(current_user.id), params, [row_validator(r) for r in rows])
+
 @router.get("/", response_model=List[ReportOut])
 def get_reports(
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    reports = []
-    if current_user.user_type_id == 1:  # Admin
-        reports = db.query(models.Report).options(joinedload(models.Report.publisher), joinedload(models.Report.reviewer), joinedload(models.Report.address)).all()
-    elif current_user.user_type_id == 2:  # Agent
-        reports = db.query(models.Report).filter(models.Report.agent_id == current_user.id).options(joinedload(models.Report.publisher), joinedload(models.Report.reviewer), joinedload(models.Report.address)).all()
-    elif current_user.user_type_id == 3: # User (assuming they can also be publishers)
-        reports = db.query(models.Report).filter(models.Report.publisher_id == current_user.id).options(joinedload(models.Report.publisher), joinedload(models.Report.reviewer), joinedload(models.Report.address)).all()
-    else:
-        reports = []
-    
-    result = []
-    for r in reports:
-        form_data = None
-        if r.form_data:
-            try:
-                form_data = json.loads(r.form_data)
-            except Exception:
-                form_data = "" if not r.form_data else r.form_data
-        
-        agent = db.query(models.User).filter(models.User.id == r.agent_id).first()
-        is_affiliate = agent.is_affiliate if agent else None
-        result.append(ReportOut(
+    query = _scope_reports(db.query(models.Report), current_user)
+    if query is None:
+        return []
+    rows = query.options(*_report_list_options()).all()
+    not_modified = _conditional(request, response, _listing_etag(request, current_user, rows, _report_row_validator))
+    if not_modified:
+        return not_modified
+    return [_list_report_out(r) for r in rows]
+
+class ReportListFilters:
+    """Query parameters shared by the paginated listing endpoints."""
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None),
+        limit: int = Query(50, ge=1, le=200),
+        status: Optional[List[str]] = Query(None),
+        report_type_id: Optional[int] = Query(None),
+        agent_id: Optional[UUID] = Query(None),
+        publisher_id: Optional[UUID] = Query(None),
+        since: Optional[datetime] = Query(None),
+        until: Optional[datetime] = Query(None)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.status = status
+        self.report_type_id = report_type_id
+        self.agent_id = agent_id
+        self.publisher_id = publisher_id
+        self.since = since
+        self.until = until
+
+    def filter(self, query):
+        """Applies the filters, without the cursor, ordering or limit."""
+        if self.status:
+            query = query.filter(models.Report.status.in_(self.status))
+        if self.report_type_id:
+            query = query.filter(models.Report.report_type_id == self.report_type_id)
+        if self.agent_id:
+            query = query.filter(models.Report.agent_id == self.agent_id)
+        if self.publisher_id:
+            query = query.filter(models.Report.publisher_id == self.publisher_id)
+        if self.since:
+            query = query.filter(models.Report.created_date >= self.since)
+        if self.until:
+            query = query.filter(models.Report.created_date < self.until)
+        return query
+
+    def apply(self, query):
+        """Filters, orders and limits a Report query (one extra row to detect a next page)."""
+        query = self.filter(query)
+        if self.cursor:
+            after_date, after_id = _decode_cursor(self.cursor)
+            query = query.filter(or_(
+                models.Report.created_date < after_date,
+                and_(models.Report.created_date == after_date, models.Report.id < after_id)
+            ))
+        return query.order_by(models.Report.created_date.desc(), models.Report.id.desc()).limit(self.limit + 1)
+
+    def paginate(self, rows):
+        """Returns (rows of this page, next_cursor)."""
+        if len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, _encode_cursor(rows[-1].created_date, rows[-1].id)
+
+@router.get("/page", response_model=ReportPage)
+def get_reports_page(
+    request: Request,
+    response: Response,
+    filters: ReportListFilters = Depends(),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Keyset-paginated report listing, newest first. Pass the returned
+    next_cursor back as `cursor` to get the following page.
+    """
+    query = _scope_reports(db.query(models.Report), current_user)
+    if query is None:
+        return ReportPage(items=[])
+    rows = filters.apply(query.options(*_report_list_options())).all()
+    not_modified = _conditional(request, response, _listing_etag(request, current_user, rows, _report_row_validator))
+    if not_modified:
+        return not_modified
+    rows, next_cursor = filters.paginate(rows)
+    return ReportPage(items=[_list_report_out(r) for r in rows], next_cursor=next_cursor)
+
+def _summary_query(db):
+    agent = aliased(models.User)
+    publisher = aliased(models.User)
+    return db.query(
+        models.Report.id,
+        models.Report.address_id,
+        models.Address.address,
+        models.Report.report_type_id,
+        models.Report.status,
+        models.Report.created_date,
+        models.Report.review_date,
+        models.Report.agent_id,
+        agent.username.label("agent"),
+        agent.is_affiliate,
+        models.Report.publisher_id,
+        publisher.username.label("publisher"),
+        models.Report.pdf_url,
+        models.Report.render_status,
+        models.Report.reward,
+        models.Report.version
+    ).outerjoin(models.Address, models.Report.address_id == models.Address.id) \
+        .outerjoin(agent, models.Report.agent_id == agent.id) \
+        .outerjoin(publisher, models.Report.publisher_id == publisher.id)
+
+def _summary_page(rows, next_cursor):
+    return ReportSummaryPage(
+        items=[ReportSummaryOut(
             id=r.id,
-            address=r.address.address,
-            address_id=r.address.id,
-            agent_id=r.agent.id if r.agent else None,
-            agent=r.agent.username if r.agent else None,
-            publisher=r.publisher.username if r.publisher else 'N/A',
-            publisher_id=r.publisher_id,
+            address=r.address,
+            address_id=r.address_id,
             report_type_id=r.report_type_id,
+            status=r.status,
             created_date=r.created_date,
             review_date=r.review_date,
-            status=r.status,
-            comment=r.comment,
-            reviewer=r.reviewer.username if r.reviewer else 'N/A',
-            reviewer_id=r.reviewer_id,
-            form_data=form_data,
+            agent_id=r.agent_id,
+            agent=r.agent,
+            is_affiliate=r.is_affiliate,
+            publisher_id=r.publisher_id,
+            publisher=r.publisher or 'N/A',
             pdf_url=r.pdf_url,
-            reward=r.reward,
-            is_affiliate=is_affiliate
-        ))
+            render_status=r.render_status,
+            reward=r.reward
+        ) for r in rows],
+        next_cursor=next_cursor
+    )
 
-    return result
+@router.get("/summary", response_model=ReportSummaryPage)
+def get_report_summaries(
+    request: Request,
+    response: Response,
+    filters: ReportListFilters = Depends(),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Same listing as /page, but only the columns the list view shows:
+    form_data is never loaded or decoded.
+    """
+    query = _scope_reports(_summary_query(db), current_user)
+    if query is None:
+        return ReportSummaryPage(items=[])
+    rows = filters.apply(query).all()
+    not_modified = _conditional(request, response, _listing_etag(request, current_user, rows, _summary_row_validator))
+    if not_modified:
+        return not_modified
+    return _summary_page(*filters.paginate(rows))
 
-@router.get("/{report_id}", response_model=ReportOut)
-def get_report(report_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+# form_data fields that /reports/form-query can filter on, and how to compare them.
+# Date fields are ISO strings and have expression indexes on Postgres (see migrations).
+FORM_QUERY_FIELDS = {
+    "smokeAlarmsWorking": "bool",
+    "rcdTestingPassed": "bool",
+    "electricalSafetyCheck": "bool",
+    "smokeSafetyCheck": "bool",
+    "nextInspectionDueDate": "date",
+    "nextSmokeAlarmCheckDate": "date",
+    "inspectionDate": "date",
+    "agentName": "text",
+    "licenceNumber": "text",
+}
+FORM_QUERY_OPS = {"eq", "ne", "lt", "lte", "gt", "gte"}
+
+def _form_condition(field, op, raw_value, dialect_name):
+    kind = FORM_QUERY_FIELDS.get(field)
+    if kind is None:
+        raise HTTPException(status_code=400, detail=f"Cannot query form field '{field}'")
+    if op not in FORM_QUERY_OPS or (kind == "bool" and op not in ("eq", "ne")):
+        raise HTTPException(status_code=400, detail=f"Unsupported operator '{op}' for '{field}'")
+    if kind == "bool":
+        if raw_value.lower() not in ("true", "false"):
+            raise HTTPException(status_code=400, detail=f"'{field}' must be true or false")
+        value = raw_value.lower() == "true"
+        if dialect_name == "postgresql":
+            # Containment (@>) is served by the GIN index on form_data
+            condition = models.Report.form_data.contains({field: value})
+        else:
+            condition = models.Report.form_data[field].as_boolean() == value
+        return condition if op == "eq" else ~condition
+    column = models.Report.form_data[field].as_string()
+    if kind == "date":
+        try:
+            raw_value = datetime.fromisoformat(raw_value).date().isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"'{field}' must be an ISO date")
+    elif kind == "text" and op == "eq" and dialect_name == "postgresql":
+        return models.Report.form_data.contains({field: raw_value})
+    return {
+        "eq": column == raw_value,
+        "ne": column != raw_value,
+        "lt": column < raw_value,
+        "lte": column <= raw_value,
+        "gt": column > raw_value,
+        "gte": column >= raw_value,
+    }[op]
+
+@router.get("/form-query", response_model=ReportSummaryPage)
+def query_reports_by_form(
+    request: Request,
+    response: Response,
+    where: List[str] = Query(..., description="field:op:value, e.g. smokeAlarmsWorking:eq:false or nextInspectionDueDate:lt:2025-01-01"),
+    filters: ReportListFilters = Depends(),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Report summaries whose form_data matches every `where` condition, with
+    the same filters and pagination as /summary.
+    """
+    query = _scope_reports(_summary_query(db), current_user)
+    if query is None:
+        return ReportSummaryPage(items=[])
+    dialect_name = db.bind.dialect.name
+    for condition in where:
+        parts = condition.split(":", 2)
+        if len(parts) != 3:
+            raise HTTPException(status_code=400, detail=f"Invalid condition '{condition}', expected field:op:value")
+        query = query.filter(_form_condition(parts[0], parts[1], parts[2], dialect_name))
+    rows = filters.apply(query).all()
+    not_modified = _conditional(request, response, _listing_etag(request, current_user, rows, _summary_row_validator))
+    if not_modified:
+        return not_modified
+    return _summary_page(*filters.paginate(rows))
+
+@router.get("/search", response_model=List[ReportSummaryOut])
+def search_reports(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Reports whose address, agent name, licence number or inspector matches
+    every word of `q`, best match first.
+    """
+    query = _scope_reports(_summary_query(db), current_user)
+    if query is None:
+        return []
+    return _summary_page(search.search_reports(db, q, query, limit), None).items
+
+STATS_DIMENSIONS = ["month", "status", "report_type_id", "agent"]
+
+@router.get("/stats", response_model=ReportStatsOut)
+def get_report_stats(
+    group_by: List[str] = Query(["status"], description=f"Any of: {', '.join(STATS_DIMENSIONS)}"),
+    since_month: Optional[str] = Query(None, description="YYYY-MM, inclusive"),
+    until_month: Optional[str] = Query(None, description="YYYY-MM, inclusive"),
+    status: Optional[List[str]] = Query(None),
+    report_type_id: Optional[int] = Query(None),
+    agent_id: Optional[UUID] = Query(None),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Report counts and reward totals grouped by any of month, status, report
+    type and agent, read from the report_stats rollup.
+    """
+    if current_user.user_type_id != constants.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can view report stats.")
+    unknown = [d for d in group_by if d not in STATS_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by: {', '.join(unknown)}")
+
+    stat = models.ReportStat
+    dimensions = {
+        "month": [stat.month],
+        "status": [stat.status],
+        "report_type_id": [stat.report_type_id],
+        "agent": [stat.agent_id, models.User.username],
+    }
+    columns = [c for d in STATS_DIMENSIONS if d in group_by for c in dimensions[d]]
+    query = db.query(*columns, func.sum(stat.report_count), func.sum(stat.reward_total))
+    if "agent" in group_by:
+        query = query.outerjoin(models.User, stat.agent_id == models.User.id)
+    if since_month:
+        query = query.filter(stat.month >= since_month)
+    if until_month:
+        query = query.filter(stat.month <= until_month)
+    if status:
+        query = query.filter(stat.status.in_(status))
+    if report_type_id:
+        query = query.filter(stat.report_type_id == report_type_id)
+    if agent_id:
+        query = query.filter(stat.agent_id == agent_id)
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+
+    groups = []
+    for row in query.all():
+        values = dict(zip([c.key for c in columns], row))
+        group = ReportStatsGroup(
+            month=values.get("month"),
+            status=values.get("status"),
+            report_type_id=values.get("report_type_id") or None,
+            agent_id=values.get("agent_id") if values.get("agent_id") != stats.NO_AGENT else None,
+            agent=values.get("username"),
+            report_count=row[-2] or 0,
+            reward_total=float(row[-1] or 0)
+        )
+        if group.report_count:
+            groups.append(group)
+    return ReportStatsOut(
+        groups=groups,
+        report_count=sum(g.report_count for g in groups),
+        reward_total=sum(g.reward_total for g in groups)
+    )
+
+EXPORT_COLUMNS = [
+    "id", "created_date", "review_date", "status", "report_type_id", "address", "agent",
+    "publisher", "reviewer", "reward", "comment", "pdf_url", "render_status"
+]
+EXPORT_MAX_FORM_FIELDS = 50
+
+def _export_query(db, columns, form_fields):
+    agent = aliased(models.User)
+    publisher = aliased(models.User)
+    reviewer = aliased(models.User)
+    available = {
+        "id": models.Report.id,
+        "created_date": models.Report.created_date,
+        "review_date": models.Report.review_date,
+        "status": models.Report.status,
+        "report_type_id": models.Report.report_type_id,
+        "address": models.Address.address,
+        "agent": agent.username,
+        "publisher": publisher.username,
+        "reviewer": reviewer.username,
+        "reward": models.Report.reward,
+        "comment": models.Report.comment,
+        "pdf_url": models.Report.pdf_url,
+        "render_status": models.Report.render_status,
+    }
+    # Only the requested form_data fields are extracted by the database
+    selected = [available[c] for c in columns] + [models.Report.form_data[f] for f in form_fields]
+    return db.query(*selected) \
+        .outerjoin(models.Address, models.Report.address_id == models.Address.id) \
+        .outerjoin(agent, models.Report.agent_id == agent.id) \
+        .outerjoin(publisher, models.Report.publisher_id == publisher.id) \
+        .outerjoin(reviewer, models.Report.reviewer_id == reviewer.id)
+
+@router.get("/export")
+def export_reports(
+    export_format: str = Query("csv", alias="format", description="csv or ndjson"),
+    columns: Optional[List[str]] = Query(None, description=f"Any of: {', '.join(EXPORT_COLUMNS)}"),
+    form_fields: Optional[List[str]] = Query(None, description="form_data keys to add as columns"),
+    filters: ReportListFilters = Depends(),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """
+    Streams every report matching the filters (cursor and limit are ignored)
+    as CSV or NDJSON, oldest first. Rows are written as they are fetched, so
+    memory use does not grow with the size of the export.
+    """
+    if export_format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    columns = columns or EXPORT_COLUMNS
+    form_fields = form_fields or []
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(unknown)}")
+    if len(form_fields) > EXPORT_MAX_FORM_FIELDS:
+        raise HTTPException(status_code=400, detail=f"At most {EXPORT_MAX_FORM_FIELDS} form fields can be exported.")
+    if current_user.user_type_id not in (constants.ADMIN, constants.AGENT, constants.USER):
+        raise HTTPException(status_code=403, detail="Not authorized to export reports")
+    header = list(columns) + [f"form_data.{f}" for f in form_fields]
+
+    def rows():
+        # The response outlives the request's DB session, so use our own
+        db = database.SessionLocal.session_factory()
+        try:
+            query = filters.filter(_scope_reports(_export_query(db, columns, form_fields), current_user))
+            query = query.order_by(models.Report.created_date, models.Report.id).yield_per(EXPORT_FETCH_SIZE)
+            for row in query:
+                yield tuple(row)
+        finally:
+            db.close()
+
+    if export_format == "ndjson":
+        body, media_type = exports.stream_ndjson(header, rows()), "application/x-ndjson"
+    else:
+        body, media_type = exports.stream_csv(header, rows()), "text/csv"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="reports.{export_format}"'}
+    )
+
+def _report_etag(report_id, version, publisher, publisher_type_id, reviewer, agent_type_id, agent_is_affiliate, address):
+    # Everything ReportOut shows that can change without the report's version moving
+    return _etag(str(report_id), version, publisher, publisher_type_id, reviewer, agent_type_id, agent_is_affiliate, address)
+
+def _report_validator(db, report_id):
+    """The report's ETag inputs and publisher_id in one indexed lookup, without form_data."""
+    publisher = aliased(models.User)
+    reviewer = aliased(models.User)
+    agent = aliased(models.User)
+    return db.query(
+        models.Report.id,
+        models.Report.version,
+        models.Report.publisher_id,
+        publisher.username.label("publisher"),
+        publisher.user_type_id.label("publisher_type_id"),
+        reviewer.username.label("reviewer"),
+        agent.user_type_id.label("agent_type_id"),
+        agent.is_affiliate.label("agent_is_affiliate"),
+        models.Address.address
+    ).outerjoin(publisher, models.Report.publisher_id == publisher.id) \
+        .outerjoin(reviewer, models.Report.reviewer_id == reviewer.id) \
+        .outerjoin(agent, models.Report.agent_id == agent.id) \
+        .outerjoin(models.Address, models.Report.address_id == models.Address.id) \
+        .filter(models.Report.id == report_id).first()
+
+def _check_report_access(publisher_id, current_user):
+    is_admin = current_user.user_type_id == 1
+    is_publisher = publisher_id == current_user.id
+    if not is_admin and not is_publisher:
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+
+def _load_report(report_id, db, current_user):
     report_query = db.query(models.Report).options(
         joinedload(models.Report.publisher).options(joinedload(models.User.agent_balance)),
         joinedload(models.Report.reviewer)
@@ -147,13 +718,11 @@ def get_report(report_id: UUID, db: Session = Depends(database.get_db), current_
         raise HTTPException(status_code=404, detail="Report not found")
         
     # Check authorization
-    is_admin = current_user.user_type_id == 1
-    is_publisher = db_report.publisher_id == current_user.id
-    
-    if not is_admin and not is_publisher:
-        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    _check_report_access(db_report.publisher_id, current_user)
+    return db_report
 
-    form_data = json.loads(db_report.form_data) if db_report.form_data else None
+def _report_out(db_report):
+    form_data = load_form_data(db_report.form_data)
     
     agent_is_affiliate = None
     if db_report.agent and db_report.agent.user_type_id == 2: # AGENT
@@ -176,7 +745,93 @@ def get_report(report_id: UUID, db: Session = Depends(database.get_db), current_
         pdf_url=db_report.pdf_url,
         reward=db_report.reward,
         agent_id=db_report.publisher_id if db_report.publisher.user_type_id == 2 else None,
-        is_affiliate=agent_is_affiliate
+        is_affiliate=agent_is_affiliate,
+        render_status=db_report.render_status
+    )
+
+def _loaded_report_etag(db_report):
+    publisher, reviewer, agent = db_report.publisher, db_report.reviewer, db_report.agent
+    return _report_etag(
+        db_report.id,
+        db_report.version,
+        publisher.username if publisher else None,
+        publisher.user_type_id if publisher else None,
+        reviewer.username if reviewer else None,
+        agent.user_type_id if agent else None,
+        agent.is_affiliate if agent else None,
+        db_report.address.address if db_report.address else None
+    )
+
+def _validator_etag(validator):
+    return _report_etag(
+        validator.id,
+        validator.version,
+        validator.publisher,
+        validator.publisher_type_id,
+        validator.reviewer,
+        validator.agent_type_id,
+        validator.agent_is_affiliate,
+        validator.address
+    )
+
+def _cache_report(db_report):
+    """Serializes `db_report`, caches it and returns (etag, ReportOut JSON)."""
+    etag = _loaded_report_etag(db_report)
+    body = _report_out(db_report).json()
+    report_cache.set(str(db_report.id), json.dumps({"etag": etag, "body": body}))
+    return etag, body
+
+def _cached_report(validator):
+    """The cached (etag, body) for the report, if it was built from its current state."""
+    entry = report_cache.get(str(validator.id))
+    if entry is None:
+        return None
+    entry = json.loads(entry)
+    if entry["etag"] != _validator_etag(validator):
+        return None
+    return entry["etag"], entry["body"]
+
+def invalidate_report(report_id):
+    report_cache.delete(str(report_id))
+
+def get_report_out(report_id, db, current_user):
+    """The ReportOut for `report_id`, as returned by GET /reports/{report_id}."""
+    db_report = _load_report(report_id, db, current_user)
+    return ReportOut.parse_raw(_cache_report(db_report)[1])
+
+@router.get("/{report_id}", response_model=ReportOut)
+def get_report(report_id: UUID, request: Request, response: Response, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    # One indexed lookup decides between 304, a cache hit and a full load.
+    # Cache entries are checked against the current version, so an entry can
+    # never outlive a change made by another process.
+    validator = _report_validator(db, report_id)
+    if not validator:
+        raise HTTPException(status_code=404, detail="Report not found")
+    _check_report_access(validator.publisher_id, current_user)
+    not_modified = _conditional(request, response, _validator_etag(validator))
+    if not_modified:
+        return not_modified
+
+    cached = _cached_report(validator)
+    if cached is None:
+        # Tag what is actually returned, even if it changed since the lookup above
+        cached = _cache_report(_load_report(report_id, db, current_user))
+    etag, body = cached
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+@router.get("/{report_id}/render-status", response_model=RenderStatusOut)
+def get_render_status(report_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_report = db.query(models.Report).filter(models.Report.id == report_id).first()
+    if not db_report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if current_user.user_type_id != 1 and db_report.publisher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this report")
+    return RenderStatusOut(
+        report_id=db_report.id,
+        render_status=db_report.render_status,
+        render_attempts=db_report.render_attempts or 0,
+        render_error=db_report.render_error,
+        pdf_url=db_report.pdf_url
     )
 
 @router.get("/presigned-url/")
@@ -189,18 +844,101 @@ def get_presigned_url(
     file_key = f"images/{uuid.uuid4()}"
     
     try:
-        url = s3_client.generate_presigned_url(
+        url = storage.s3_client.generate_presigned_url(
             'put_object',
-            Params={'Bucket': S3_BUCKET, 'Key': file_key, 'ContentType': content_type}, # You might want to make ContentType dynamic
+            Params={'Bucket': storage.S3_BUCKET, 'Key': file_key, 'ContentType': content_type}, # You might want to make ContentType dynamic
             ExpiresIn=3600  # URL expires in 1 hour
         )
-        public_url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{file_key}"
+        public_url = storage.public_url(file_key)
         return {"upload_url": url, "public_url": public_url}
     except NoCredentialsError:
         raise HTTPException(status_code=500, detail="AWS credentials not available.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate presigned URL: {e}")
 
+@router.post("/presigned-urls", response_model=PresignedBatchOut)
+def get_presigned_urls(request_data: PresignedBatchRequest):
+    """
+    Issues presigned uploads for several files at once, in request order.
+    Each is bound to its declared content type and size: a PUT must send
+    exactly that many bytes, a POST at most that many.
+    """
+    if request_data.method not in ("put", "post"):
+        raise HTTPException(status_code=400, detail="method must be put or post")
+    if not request_data.files:
+        return PresignedBatchOut(uploads=[])
+    if len(request_data.files) > PRESIGNED_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {PRESIGNED_BATCH_MAX_FILES} files per request.")
+    for i, f in enumerate(request_data.files):
+        if f.content_type not in UPLOAD_CONTENT_TYPES:
+            raise HTTPException(status_code=400, detail=f"File {i}: content type {f.content_type} is not allowed")
+        if f.size <= 0 or f.size > UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=400, detail=f"File {i}: size must be between 1 and {UPLOAD_MAX_BYTES} bytes")
+
+    uploads = []
+    for f in request_data.files:
+        file_key = f"images/{uuid.uuid4()}"
+        # Signing is local (no S3 round trip), so a batch costs about as much as one URL
+        signed = storage.presigned_upload(
+            file_key,
+            f.content_type,
+            f.size,
+            method=request_data.method,
+            expires_in=UPLOAD_URL_EXPIRES
+        )
+        uploads.append(PresignedUpload(
+            method=signed["method"],
+            upload_url=signed["url"],
+            fields=signed.get("fields"),
+            public_url=storage.public_url(file_key),
+            content_type=f.content_type
+        ))
+    return PresignedBatchOut(uploads=uploads)
+
+@router.post("/export/zip")
+def export_reports_zip(request: ReportZipRequest, current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Streams a ZIP of the PDFs of every report matching the filter. Agents
+    only get their own reports.
+    """
+    agent_id = request.agent_id
+    if current_user.user_type_id == constants.AGENT:
+        agent_id = current_user.id
+    elif current_user.user_type_id != constants.ADMIN:
+        raise HTTPException(status_code=403, detail="Not authorized to export reports")
+
+    def entries():
+        # The response outlives the request's DB session, so use our own
+        db = database.SessionLocal.session_factory()
+        try:
+            query = db.query(
+                models.Report.id,
+                models.Report.pdf_url,
+                models.Report.report_type_id,
+                models.Report.created_date,
+                models.Address.address
+            ).outerjoin(models.Address, models.Report.address_id == models.Address.id).filter(models.Report.pdf_url.isnot(None))
+            if agent_id:
+                query = query.filter(models.Report.agent_id == agent_id)
+            if request.address_ids:
+                query = query.filter(models.Report.address_id.in_(request.address_ids))
+            if request.status:
+                query = query.filter(models.Report.status.in_(request.status))
+            if request.since:
+                query = query.filter(models.Report.created_date >= request.since)
+            if request.until:
+                query = query.filter(models.Report.created_date < request.until)
+            for row in query.order_by(models.Report.created_date).yield_per(500):
+                yield exports.archive_name(row.address, row.report_type_id, row.created_date, row.id), row.pdf_url
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        exports.stream_zip(entries()),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="reports.zip"'}
+    )
+
 @router.post("/create")
 def create_report(report_data: ReportCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     # Extract address, address_id, and agent_id from form_data
@@ -212,6 +950,8 @@ def create_report(report_data: ReportCreate, db: Session = Depends(database.get_
     # Address validation
     if not address or not str(address).strip():
         raise HTTPException(status_code=400, detail="Address is required.")
+    # Shed load before writing anything, rather than leave a report that no job renders
+    render_jobs.check_capacity()
 
     # If address_id is missing but address is present, insert or get address
     if address and not address_id:
@@ -223,8 +963,9 @@ def create_report(report_data: ReportCreate, db: Session = Depends(database.get_
             db.add(address_obj)
             db.commit()
             db.refresh(address_obj)
+            search.address_added(address_obj.id, address_obj.address)
         address_id = address_obj.id
-        form_data["address_id"] = address_id
+        form_data["address_id"] = str(address_id)
         
         # If agent_id is present and address_id is missing (i.e., new address), link agent and address
         if agent_id:
@@ -235,28 +976,28 @@ def create_report(report_data: ReportCreate, db: Session = Depends(database.get_
                 db.commit()
 
 
-    temp_filename = f"/tmp/{uuid.uuid4()}.pdf"
-    checkhero.generate_pdf_dispatcher(form_data, report_data.report_type_id, temp_filename)
-    
-    s3_filename = f"reports/{uuid.uuid4()}.pdf"
-    pdf_url = upload_to_s3(temp_filename, s3_filename)
-
-    os.remove(temp_filename)
-
+    # The PDF is rendered and uploaded by a background job; poll
+    # /reports/{id}/render-status for its progress.
     new_report = models.Report(
-        form_data=json.dumps(form_data),
+        form_data=form_data,
         publisher_id=current_user.id,
         address_id=address_id,
         report_type_id=report_data.report_type_id,
         status="draft",
-        pdf_url=pdf_url,
+        pdf_url=None,
+        render_status=constants.RENDER_RENDERING,
         agent_id=agent_id,
-        created_date=datetime.now(timezone.utc)
+        created_date=datetime.now(timezone.utc),
+        search_text=search.report_search_text(form_data, address)
     )
     db.add(new_report)
+    stats.record_change(db, after=stats.snapshot(new_report))
     db.commit()
     db.refresh(new_report)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['create'], target_type=constants.targetTypes['report'], target_id=new_report.id)
+    invalidate_report(new_report.id)
+    search.report_changed(new_report.id, new_report.search_text)
+    render_jobs.enqueue(new_report.id)
     return new_report
 
 @router.put("/update/{report_id}", response_model=ReportOut)
@@ -265,83 +1006,92 @@ def update_report(report_id: UUID, update_data: ReportUpdate, db: Session = Depe
     if not db_report:
         raise HTTPException(status_code=404, detail="Report not found")
 
+    needs_render = False
     if update_data.form_data:
-        db_report.form_data = json.dumps(update_data.form_data)
-        # Also regenerate PDF
-        temp_filename = f"/tmp/{uuid.uuid4()}.pdf"
-        checkhero.generate_pdf_dispatcher(update_data.form_data, db_report.report_type_id, temp_filename)
-        s3_filename = f"reports/{uuid.uuid4()}.pdf"
-        pdf_url = upload_to_s3(temp_filename, s3_filename)
-        os.remove(temp_filename)
-        db_report.pdf_url = pdf_url
+        db_report.form_data = update_data.form_data
+        db_report.search_text = search.report_search_text(
+            update_data.form_data, db_report.address.address if db_report.address else None
+        )
+        # Also regenerate PDF, in the background, unless the current PDF was
+        # already rendered from exactly this form
+        if checkhero.render_hash(update_data.form_data, db_report.report_type_id) == db_report.render_hash:
+            db_report.render_status = constants.RENDER_READY
+        else:
+            needs_render = True
+            db_report.render_status = constants.RENDER_RENDERING
+        db_report.render_attempts = 0
+        db_report.render_error = None
 
     if update_data.comment:
         db_report.comment = update_data.comment
+    if needs_render:
+        render_jobs.check_capacity()
     
     db.commit()
     db.refresh(db_report)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['update'], target_type=constants.targetTypes['report'], target_id=report_id)
-    return get_report(report_id, db, current_user)
+    invalidate_report(report_id)
+    search.report_changed(report_id, db_report.search_text)
+    if needs_render:
+        render_jobs.enqueue(report_id)
+    return get_report_out(report_id, db, current_user)
 
 @router.put("/approve/{report_id}", response_model=ReportOut)
 def approve_report(report_id: UUID, request_data: ApproveReportRequest, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.user_type_id != 1: # ADMIN
         raise HTTPException(status_code=403, detail="Only admins can approve reports.")
 
-    db_report = db.query(models.Report).options(joinedload(models.Report.publisher)).filter(models.Report.id == report_id).first()
+    # The report row stays locked until the commit below, so concurrent
+    # approvals of the same report are applied one after the other
+    db_report = db.query(models.Report).options(joinedload(models.Report.agent)) \
+        .filter(models.Report.id == report_id).with_for_update(of=models.Report).first()
     if not db_report:
         raise HTTPException(status_code=404, detail="Report not found")
+    before = stats.snapshot(db_report)
+
+    # A report is approved, and its reward credited, only once. The status is
+    # claimed with a conditional UPDATE rather than checked in Python, so the
+    # check also holds where FOR UPDATE is a no-op (SQLite serializes the
+    # UPDATEs instead and the later one matches no row)
+    claimed = db.query(models.Report) \
+        .filter(models.Report.id == report_id, or_(models.Report.status.is_(None), models.Report.status != "approved")) \
+        .update({"status": "approved"}, synchronize_session="evaluate")
+    if not claimed:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Report is already approved")
 
-    db_report.status = "approved"
     db_report.review_date = datetime.now(timezone.utc)
     db_report.reviewer_id = current_user.id
     if request_data.comment:
         db_report.comment = request_data.comment
 
     # Handle reward for affiliated agents
+    rewards = {}
     agent = db_report.agent
     if agent and agent.user_type_id == 2 and agent.is_affiliate: # AGENT
         if request_data.reward is None or request_data.reward <= 0:
+            db.rollback()
             raise HTTPException(status_code=400, detail="A positive reward is required for an affiliated agent.")
         
         db_report.reward = request_data.reward
-        
-        # Update agent balance
-        agent_balance = db.query(models.AgentBalance).filter(models.AgentBalance.agent_id == agent.id).first()
-        if agent_balance:
-            agent_balance.balance += Decimal(str(request_data.reward))
-        else:
-            # Create a balance record if it doesn't exist
-            new_balance = models.AgentBalance(agent_id=agent.id, balance=request_data.reward)
-            db.add(new_balance)
+        rewards[agent.id] = Decimal(str(request_data.reward))
 
-    db.commit()
-    db.refresh(db_report)
-    log_audit(db, user_id=current_user.id, action=constants.actionTypes['approve'], target_type=constants.targetTypes['report'], target_id=report_id)
-
-    # Update or create AddressReport for this address and report type
-    address_id = db_report.address_id
-    report_type_id = db_report.report_type_id
-    review_date = db_report.created_date
-    # Ensure review_date is a datetime object
-    if isinstance(review_date, str):
-        review_date = datetime.fromisoformat(review_date)
-    if address_id and report_type_id:
-        address_report = db.query(models.AddressReport).filter_by(address_id=address_id, last_inspect_type_id=report_type_id).first()
-        if address_report:
-            address_report.last_report_id = db_report.id
-            address_report.last_inspect_time = review_date
-        else:
-            address_report = models.AddressReport(
-                address_id=address_id,
-                last_report_id=db_report.id,
-                last_inspect_type_id=report_type_id,
-                last_inspect_time=review_date
-            )
-            db.add(address_report)
+    # Report, agent balance, AddressReport and audit entry in one transaction.
+    # The balance is incremented in SQL, so concurrent approvals for the same
+    # agent cannot overwrite each other.
+    try:
+        db.flush()
+        _credit_agent_balances(db, rewards)
+        _record_address_reports(db, [db_report])
+        stats.record_change(db, before, stats.snapshot(db_report))
+        log_audit(db, user_id=current_user.id, action=constants.actionTypes['approve'], target_type=constants.targetTypes['report'], target_id=report_id, commit=False)
         db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to approve report: {e}")
 
-    return get_report(report_id, db, current_user)
+    invalidate_report(report_id)
+    return get_report_out(report_id, db, current_user)
 
 @router.put("/decline/{report_id}", response_model=ReportOut)
 def decline_report(report_id: UUID, request_data: DeclineReportRequest, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
@@ -352,16 +1102,164 @@ def decline_report(report_id: UUID, request_data: DeclineReportRequest, db: Sess
     if not db_report:
         raise HTTPException(status_code=404, detail="Report not found")
 
+    before = stats.snapshot(db_report)
     db_report.status = "declined"
     db_report.review_date = datetime.utcnow()
     db_report.reviewer_id = current_user.id
     if request_data.comment:
         db_report.comment = request_data.comment
 
+    stats.record_change(db, before, stats.snapshot(db_report))
     db.commit()
     db.refresh(db_report)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['decline'], target_type=constants.targetTypes['report'], target_id=report_id)
-    return get_report(report_id, db, current_user)
+    invalidate_report(report_id)
+    return get_report_out(report_id, db, current_user)
+
+def _credit_agent_balances(db, rewards):
+    """Adds {agent_id: amount} to the agents' balances in one statement."""
+    if not rewards:
+        return
+    table = models.AgentBalance.__table__
+    stmt = upsert(db, table).values([
+        {"id": uuid.uuid4(), "agent_id": agent_id, "balance": amount}
+        for agent_id, amount in rewards.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.agent_id],
+        set_={"balance": table.c.balance + stmt.excluded.balance}
+    )
+    db.execute(stmt)
+
+def _record_address_reports(db, reports):
+    """Points each report's (address, report type) row in address_reports at it, in one statement."""
+    latest = {}
+    for r in reports:
+        if r.address_id and r.report_type_id:
+            # One row may only be touched once per statement; the newest report wins
+            key = (r.address_id, r.report_type_id)
+            if key not in latest or latest[key].created_date <= r.created_date:
+                latest[key] = r
+    if not latest:
+        return
+    table = models.AddressReport.__table__
+    stmt = upsert(db, table).values([
+        {
+            "id": uuid.uuid4(),
+            "address_id": r.address_id,
+            "last_report_id": r.id,
+            "last_inspect_type_id": r.report_type_id,
+            "last_inspect_time": r.created_date
+        }
+        for r in latest.values()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.address_id, table.c.last_inspect_type_id],
+        set_={"last_report_id": stmt.excluded.last_report_id, "last_inspect_time": stmt.excluded.last_inspect_time}
+    )
+    db.execute(stmt)
+
+@router.post("/bulk-review", response_model=BulkReviewOut)
+def bulk_review_reports(request_data: BulkReviewRequest, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    """
+    Approves or declines many reports in one transaction. Items that cannot
+    be applied (missing, already reviewed the same way, missing reward) are
+    reported back and skipped; all others are committed together.
+    """
+    if current_user.user_type_id != constants.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can review reports.")
+    if len(request_data.items) > BULK_REVIEW_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_REVIEW_MAX_ITEMS} reports can be reviewed at once.")
+
+    ids = [item.report_id for item in request_data.items]
+    # Row locks keep concurrent reviews of the same reports from crediting twice
+    db_reports = {
+        r.id: r for r in db.query(models.Report)
+        .options(joinedload(models.Report.agent))
+        .filter(models.Report.id.in_(ids))
+        .with_for_update(of=models.Report)
+        .all()
+    }
+
+    now = datetime.now(timezone.utc)
+    checked = []
+    seen = set()
+    for item in request_data.items:
+        db_report = db_reports.get(item.report_id)
+        if item.action not in ("approve", "decline"):
+            error = f"Unknown action '{item.action}'"
+        elif item.report_id in seen:
+            error = "Report listed more than once"
+        elif not db_report:
+            error = "Report not found"
+        elif db_report.status == ("approved" if item.action == "approve" else "declined"):
+            error = f"Report is already {db_report.status}"
+        else:
+            error = None
+        agent = db_report.agent if db_report else None
+        is_affiliate_agent = agent and agent.user_type_id == constants.AGENT and agent.is_affiliate
+        if not error and item.action == "approve" and is_affiliate_agent and (item.reward is None or item.reward <= 0):
+            error = "A positive reward is required for an affiliated agent."
+        seen.add(item.report_id)
+        checked.append((item, db_report, error, agent, is_affiliate_agent))
+
+    # Approvals claim their reports with one conditional UPDATE, as in
+    # approve_report: where FOR UPDATE is a no-op, a report approved
+    # concurrently is not claimed here and its reward is not credited again
+    to_approve = [item.report_id for item, _, error, _, _ in checked if not error and item.action == "approve"]
+    claimed = set()
+    if to_approve:
+        claimed = set(db.execute(
+            update(models.Report)
+            .where(models.Report.id.in_(to_approve), or_(models.Report.status.is_(None), models.Report.status != "approved"))
+            .values(status="approved")
+            .returning(models.Report.id),
+            execution_options={"synchronize_session": False}
+        ).scalars())
+
+    results = []
+    rewards = {}
+    approved = []
+    changes = []
+    for item, db_report, error, agent, is_affiliate_agent in checked:
+        if not error and item.action == "approve" and item.report_id not in claimed:
+            error = "Report is already approved"
+        if error:
+            results.append(BulkReviewResult(report_id=item.report_id, ok=False, detail=error))
+            continue
+
+        before = stats.snapshot(db_report)
+        db_report.review_date = now
+        db_report.reviewer_id = current_user.id
+        if item.comment:
+            db_report.comment = item.comment
+        if item.action == "approve":
+            db_report.status = "approved"
+            if is_affiliate_agent:
+                reward = Decimal(str(item.reward))
+                db_report.reward = reward
+                rewards[agent.id] = rewards.get(agent.id, Decimal(0)) + reward
+            approved.append(db_report)
+        else:
+            db_report.status = "declined"
+        changes.append((before, stats.snapshot(db_report)))
+        log_audit(db, user_id=current_user.id, action=constants.actionTypes[item.action], target_type=constants.targetTypes['report'], target_id=db_report.id, commit=False)
+        results.append(BulkReviewResult(report_id=item.report_id, ok=True, status=db_report.status))
+
+    try:
+        db.flush()
+        _credit_agent_balances(db, rewards)
+        _record_address_reports(db, approved)
+        stats.record_changes(db, changes)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to apply reviews: {e}")
+
+    for result in results:
+        if result.ok:
+            invalidate_report(result.report_id)
+    return BulkReviewOut(results=results)
 
 @router.delete("/delete/{report_id}")
 def delete_report(report_id: UUID, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
@@ -369,7 +1267,10 @@ def delete_report(report_id: UUID, db: Session = Depends(database.get_db), curre
     if not db_report:
         raise HTTPException(status_code=404, detail="Report not found")
     
+    stats.record_change(db, before=stats.snapshot(db_report))
     db.delete(db_report)
     db.commit()
+    invalidate_report(report_id)
+    search.report_removed(report_id)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['delete'], target_type=constants.targetTypes['report'], target_id=report_id)
     return {"detail": "Report deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Address and report search for the typeahead and the report search endpoint.
+
+On Postgres both run in the database against pg_trgm GiST indexes (created by
+migrations.enable_trigram_search): every query token must be a substring of
+the text, and matches come back in trigram-distance order straight from the
+index, so a typeahead query stops after `limit` rows instead of ranking every
+match. Elsewhere (SQLite in development) the same queries are answered from
+in-process trigram indexes that are built on first use, kept current by the
+address/report hooks below and rebuilt every SEARCH_INDEX_REFRESH_SECONDS to
+pick up writes from other processes.
+"""
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from sqlalchemy import and_, func
+from app import models
+
+# --- Search configuration ---
+SEARCH_INDEX_REFRESH_SECONDS = int(os.environ.get("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+# Fallback index only: ranked matches checked against the caller's scope per query
+SEARCH_SCOPE_BATCH_SIZE = int(os.environ.get("SEARCH_SCOPE_BATCH_SIZE", "1000"))
+
+# form_data values that go into Report.search_text, besides the address
+REPORT_SEARCH_FIELDS = [
+    ("propertyAddress",),
+    ("agentName",),
+    ("licenceNumber",),
+    ("electricalSafetyCheckCompletedBy",),
+    ("inspectorDetails", "inspectorName"),
+]
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Lowercases and reduces `text` to space-separated alphanumeric words."""
+    return _NON_WORD.sub(" ", (text or "").lower()).strip()
+
+
+def tokens(query):
+    return normalize(query).split()
+
+
+def report_search_text(form_data, address=None):
+    """The normalized text a report is searched by; stored in Report.search_text."""
+    parts = [address]
+    for path in REPORT_SEARCH_FIELDS:
+        value = form_data or {}
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, str):
+            parts.append(value)
+    words = []
+    for part in parts:
+        for word in tokens(part):
+            if word not in words:
+                words.append(word)
+    return " ".join(words)
+
+
+def _trigrams(text):
+    """pg_trgm-style trigrams: each word padded with two spaces in front and one behind."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _query_trigrams(token):
+    # No padding, so a token matches anywhere in a word, as LIKE '%token%'
+    # does on Postgres. Tokens too short for a trigram of their own are
+    # padded in front and only match at the start of a word.
+    if len(token) < 3:
+        token = f"  {token}"
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class NgramIndex:
+    """In-process trigram index over (key, normalized text) pairs."""
+
+    def __init__(self):
+        self._texts = {}
+        self._sizes = {}  # key -> number of distinct trigrams in its text
+        self._postings = {}
+        self._lock = threading.Lock()
+
+    def add(self, key, text):
+        text = normalize(text)
+        with self._lock:
+            self._remove(key)
+            grams = _trigrams(text)
+            self._texts[key] = text
+            self._sizes[key] = len(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        del self._sizes[key]
+        for gram in _trigrams(text):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def __len__(self):
+        return len(self._texts)
+
+    def search(self, query, limit):
+        """The first `limit` keys of ranked(query)."""
+        return list(itertools.islice(self.ranked(query), limit))
+
+    def ranked(self, query):
+        """
+        Iterates over the keys whose text contains every query token (tokens
+        under three characters: as a word prefix), best first. Ranking is
+        lazy, so taking only the first few of many matches stays cheap.
+        """
+        query_tokens = tokens(query)
+        if not query_tokens:
+            return iter(())
+        joined = " ".join(query_tokens)
+        query_grams = _trigrams(joined)
+        with self._lock:
+            candidates = None
+            for token in query_tokens:
+                for gram in sorted(_query_trigrams(token), key=lambda g: len(self._postings.get(g, ()))):
+                    keys = self._postings.get(gram, set())
+                    candidates = set(keys) if candidates is None else candidates & keys
+                    if not candidates:
+                        return iter(())
+            candidates = [key for key in candidates if all(token in self._texts[key] for token in query_tokens)]
+            # Shared trigrams counted from the postings, not by re-splitting every text
+            shared = dict.fromkeys(candidates, 0)
+            for gram in query_grams:
+                for key in self._postings.get(gram, ()):
+                    if key in shared:
+                        shared[key] += 1
+            ranks = [
+                (
+                    not self._texts[key].startswith(joined),
+                    -shared[key] / (self._sizes[key] + len(query_grams) - shared[key]),
+                    len(self._texts[key]),
+                    i,
+                )
+                for i, key in enumerate(candidates)
+            ]
+        heapq.heapify(ranks)
+        return (candidates[heapq.heappop(ranks)[3]] for _ in range(len(ranks)))
+
+
+class _LazyIndex:
+    """An NgramIndex loaded from the DB on first use and reloaded when it gets old."""
+
+    def __init__(self, load):
+        self._load = load
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db):
+        with self._lock:
+            if self._index is None or time.monotonic() - self._built_at > SEARCH_INDEX_REFRESH_SECONDS:
+                index = NgramIndex()
+                for key, text in self._load(db):
+                    index.add(key, text)
+                self._index = index
+                self._built_at = time.monotonic()
+            return self._index
+
+    def add(self, key, text):
+        if self._index is not None:
+            self._index.add(key, text)
+
+    def remove(self, key):
+        if self._index is not None:
+            self._index.remove(key)
+
+
+_address_index = _LazyIndex(lambda db: db.query(models.Address.id, models.Address.address).yield_per(5000))
+_report_index = _LazyIndex(lambda db: db.query(models.Report.id, models.Report.search_text)
+                           .filter(models.Report.search_text.isnot(None)).yield_per(5000))
+
+
+def address_added(address_id, address):
+    _address_index.add(address_id, address)
+
+
+def report_changed(report_id, search_text):
+    _report_index.add(report_id, search_text)
+
+
+def report_removed(report_id):
+    _report_index.remove(report_id)
+
+
+def _uses_trigram_index(db):
+    return db.bind.dialect.name == "postgresql"
+
+
+def search_addresses(db, query, limit=10):
+    """Returns [(address_id, address)] best first."""
+    query_tokens = tokens(query)
+    if not query_tokens:
+        return []
+    if _uses_trigram_index(db):
+        text = func.lower(models.Address.address)
+        return db.query(models.Address.id, models.Address.address) \
+            .filter(and_(*[text.like(f"%{token}%") for token in query_tokens])) \
+            .order_by(text.op("<->")(" ".join(query_tokens)), models.Address.address) \
+            .limit(limit).all()
+    ids = _address_index.get(db).search(query, limit)
+    rows = {row.id: row for row in db.query(models.Address.id, models.Address.address).filter(models.Address.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
+
+
+def search_reports(db, query, report_query, limit=20):
+    """
+    Returns the reports of `report_query` (already scoped to the caller)
+    whose search_text matches `query`, best first.
+    """
+    query_tokens = tokens(query)
+    if not query_tokens:
+        return []
+    if _uses_trigram_index(db):
+        text = models.Report.search_text
+        return report_query \
+            .filter(and_(*[text.like(f"%{token}%") for token in query_tokens])) \
+            .order_by(text.op("<->")(" ".join(query_tokens)), models.Report.created_date.desc()) \
+            .limit(limit).all()
+    # Matches come ranked but unscoped: walk them in batches until `limit`
+    # of them are within the caller's scope
+    ranked = _report_index.get(db).ranked(query)
+    results = []
+    while len(results) < limit:
+        batch = list(itertools.islice(ranked, SEARCH_SCOPE_BATCH_SIZE))
+        if not batch:
+            break
+        rows = {row.id: row for row in report_query.filter(models.Report.id.in_(batch))}
+        results.extend(rows[i] for i in batch if i in rows)
+    return results[:limit]
@@ -0,0 +1,162 @@
+"""
+Report counts and reward totals by month, status, report type and agent.
+
+The report_stats rollup has one row per group. Handlers apply each report
+change to it as a delta inside their own transaction (record_change), so the
+dashboard reads O(groups) rows. A periodic full recompute rebuilds the table
+from reports and corrects any drift, e.g. from rows changed outside the API.
+"""
+import os
+import threading
+import uuid
+from decimal import Decimal
+from sqlalchemy import func, text
+from app import models
+from app.utils import upsert
+
+# --- Stats configuration ---
+# Seconds between full recomputes of report_stats; 0 disables them
+STATS_RECOMPUTE_SECONDS = int(os.environ.get("STATS_RECOMPUTE_SECONDS", "3600"))
+
+# report_stats.agent_id for reports without an agent; NULLs never conflict in
+# a unique index, so report_type_id uses 0 the same way. (Not the nil UUID:
+# SQLite would store its all-digit hex as the integer 0.)
+NO_AGENT = uuid.UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
+
+
+def _month(created_date):
+    return created_date.strftime("%Y-%m") if created_date else "unknown"
+
+
+def snapshot(report):
+    """The group and reward `report` currently counts towards; pass to record_change."""
+    agent_id = uuid.UUID(str(report.agent_id)) if report.agent_id else NO_AGENT
+    key = (_month(report.created_date), report.status or "draft", report.report_type_id or 0, agent_id)
+    return key, Decimal(str(report.reward or 0))
+
+
+def record_change(db, before=None, after=None):
+    """
+    Applies a report change to the rollup in the caller's transaction.
+    `before`/`after` are snapshot()s; None for a created or deleted report.
+    """
+    record_changes(db, [(before, after)])
+
+
+def record_changes(db, changes):
+    """record_change for many (before, after) pairs, in one statement."""
+    deltas = {}
+    for before, after in changes:
+        for change, sign in ((before, -1), (after, 1)):
+            if change is None:
+                continue
+            key, reward = change
+            count, total = deltas.get(key, (0, Decimal(0)))
+            deltas[key] = (count + sign, total + sign * reward)
+    deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+    table = models.ReportStat.__table__
+    stmt = upsert(db, table).values([
+        {
+            "id": uuid.uuid4(),
+            "month": month,
+            "status": status,
+            "report_type_id": report_type_id,
+            "agent_id": agent_id,
+            "report_count": count,
+            "reward_total": total,
+        }
+        for (month, status, report_type_id, agent_id), (count, total) in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.month, table.c.status, table.c.report_type_id, table.c.agent_id],
+        set_={
+            "report_count": table.c.report_count + stmt.excluded.report_count,
+            "reward_total": table.c.reward_total + stmt.excluded.reward_total,
+        }
+    )
+    db.execute(stmt)
+
+
+def recompute(db):
+    """Rebuilds report_stats from the reports table in one transaction."""
+    if db.bind.dialect.name == "postgresql":
+        # Handlers' deltas wait for the rebuild instead of landing in the
+        # middle of it and being wiped
+        db.execute(text("LOCK TABLE report_stats IN EXCLUSIVE MODE"))
+        month = func.to_char(models.Report.created_date, "YYYY-MM")
+    else:
+        month = func.strftime("%Y-%m", models.Report.created_date)
+    rows = db.query(
+        month,
+        func.coalesce(models.Report.status, "draft"),
+        models.Report.report_type_id,
+        models.Report.agent_id,
+        func.count(models.Report.id),
+        func.sum(models.Report.reward)
+    ).group_by(month, func.coalesce(models.Report.status, "draft"), models.Report.report_type_id, models.Report.agent_id).all()
+
+    db.query(models.ReportStat).delete(synchronize_session=False)
+    db.add_all([
+        models.ReportStat(
+            month=row[0] or "unknown",
+            status=row[1],
+            report_type_id=row[2] or 0,
+            agent_id=row[3] or NO_AGENT,
+            report_count=row[4],
+            reward_total=row[5] or 0
+        )
+        for row in rows
+    ])
+    db.commit()
+    return len(rows)
+
+
+_stop = threading.Event()
+_thread = None
+
+
+def _reconcile_forever():
+    from app.database import SessionLocal
+
+    while True:
+        db = SessionLocal.session_factory()
+        try:
+            groups = recompute(db)
+            print(f"report_stats recomputed: {groups} groups")
+        except Exception as e:
+            db.rollback()
+            print(f"report_stats recompute failed: {e}")
+        finally:
+            db.close()
+        if _stop.wait(STATS_RECOMPUTE_SECONDS):
+            return
+
+
+def start_reconciler():
+    """Recomputes report_stats now and then every STATS_RECOMPUTE_SECONDS in a daemon thread."""
+    global _thread
+    if STATS_RECOMPUTE_SECONDS <= 0 or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_reconcile_forever, name="report-stats", daemon=True)
+    _thread.start()
+
+
+def stop_reconciler():
+    global _thread
+    _stop.set()
+    _thread = None
+
+
+if __name__ == "__main__":
+    # One-off rebuild, e.g. when the periodic recompute is disabled:
+    #   python -m app.stats
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"report_stats recomputed: {recompute(db)} groups")
+    finally:
+        db.close()
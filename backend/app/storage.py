@@ -0,0 +1,339 @@
+import boto3
+import hashlib
+import hmac
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from urllib.parse import urlencode
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config
+from botocore.exceptions import NoCredentialsError
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from app.utils import backoff_delay
+
+load_dotenv()
+
+# --- S3 Configuration ---
+S3_BUCKET = os.environ.get("S3_BUCKET_NAME")
+AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
+AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
+AWS_REGION = os.environ.get("AWS_REGION")
+
+# --- Storage backend selection ---
+# "s3" in production; "local" keeps objects under LOCAL_STORAGE_DIR instead,
+# for local development and tests.
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_DIR = os.environ.get("LOCAL_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "checkhero-storage"))
+LOCAL_STORAGE_URL = os.environ.get("LOCAL_STORAGE_URL", "http://localhost:8000/files")
+# Signs the local backend's upload URLs (see app.files)
+LOCAL_STORAGE_SECRET = os.environ.get("LOCAL_STORAGE_SECRET", "local-storage-secret")
+
+# --- Upload configuration ---
+STORAGE_UPLOAD_WORKERS = int(os.environ.get("STORAGE_UPLOAD_WORKERS", "4"))
+STORAGE_UPLOAD_ATTEMPTS = int(os.environ.get("STORAGE_UPLOAD_ATTEMPTS", "4"))
+STORAGE_RETRY_BACKOFF_BASE = float(os.environ.get("STORAGE_RETRY_BACKOFF_BASE", "0.5"))  # seconds
+STORAGE_RETRY_BACKOFF_MAX = float(os.environ.get("STORAGE_RETRY_BACKOFF_MAX", "10"))  # seconds
+STORAGE_UPLOAD_TIMEOUT = float(os.environ.get("STORAGE_UPLOAD_TIMEOUT", "300"))  # seconds, all attempts
+# Objects above the threshold go up as parallel multipart uploads
+S3_MULTIPART_THRESHOLD = int(os.environ.get("S3_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+S3_MULTIPART_CHUNKSIZE = int(os.environ.get("S3_MULTIPART_CHUNKSIZE", str(8 * 1024 * 1024)))
+S3_MULTIPART_CONCURRENCY = int(os.environ.get("S3_MULTIPART_CONCURRENCY", "4"))
+
+s3_client = boto3.client(
+    's3',
+    aws_access_key_id=AWS_ACCESS_KEY_ID,
+    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+    region_name=AWS_REGION,
+    config=Config(
+        s3={'addressing_style': 'virtual'},
+        # SigV4 signs Content-Length into presigned PUTs; SigV2 can't
+        signature_version='s3v4',
+        # Enough connections for every upload worker's multipart parts
+        max_pool_connections=max(10, STORAGE_UPLOAD_WORKERS * S3_MULTIPART_CONCURRENCY)
+    )
+)
+
+transfer_config = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+    max_concurrency=S3_MULTIPART_CONCURRENCY
+)
+
+
+class S3Storage:
+    def __init__(self, client, bucket, region):
+        self.client = client
+        self.bucket = bucket
+        self.region = region
+
+    def public_url(self, key):
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+    def key_from_url(self, url):
+        prefix = self.public_url("")
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+    def upload_fileobj(self, fileobj, key, content_type=None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra_args, Config=transfer_config)
+        return self.public_url(key)
+
+    def open(self, key):
+        """Returns a streaming, readable body for `key`."""
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+    def list_objects(self, prefix=""):
+        """Yields (key, size, last_modified) for every object under `prefix`, one listing page at a time."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, PaginationConfig={"PageSize": 1000}):
+            for obj in page.get("Contents", []):
+                yield obj["Key"], obj["Size"], obj["LastModified"]
+
+    def delete_objects(self, keys):
+        """Deletes up to 1000 keys in one request; returns the keys that could not be deleted."""
+        response = self.client.delete_objects(
+            Bucket=self.bucket,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+        return [error["Key"] for error in response.get("Errors", [])]
+
+    def presigned_put(self, key, content_type, size, expires_in=3600):
+        """A URL the client can PUT exactly `size` bytes of this content type to."""
+        params = {'Bucket': self.bucket, 'Key': key, 'ContentType': content_type, 'ContentLength': size}
+        return {"method": "PUT", "url": self.client.generate_presigned_url('put_object', Params=params, ExpiresIn=expires_in)}
+
+    def presigned_post(self, key, content_type, max_bytes, expires_in=3600):
+        """A browser form POST policy limited to this content type and at most `max_bytes`."""
+        post = self.client.generate_presigned_post(
+            self.bucket,
+            key,
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ["content-length-range", 1, max_bytes]],
+            ExpiresIn=expires_in
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"]}
+
+
+class LocalStorage:
+    def __init__(self, directory, base_url, secret):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/")
+        self.secret = secret
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.directory, key))
+        if not path.startswith(os.path.abspath(self.directory) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def file_path(self, key):
+        """The file that holds `key`; raises ValueError for keys outside the directory."""
+        return self._path(key)
+
+    def public_url(self, key):
+        return f"{self.base_url}/{key}"
+
+    def key_from_url(self, url):
+        prefix = self.public_url("")
+        if url and url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+    def upload_fileobj(self, fileobj, key, content_type=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(fileobj, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.public_url(key)
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def list_objects(self, prefix=""):
+        root = os.path.abspath(self.directory)
+        start = os.path.join(root, os.path.dirname(prefix))
+        for dirpath, dirnames, filenames in os.walk(start):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    st = os.stat(path)
+                    yield key, st.st_size, datetime.fromtimestamp(st.st_mtime, timezone.utc)
+
+    def delete_objects(self, keys):
+        failed = []
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError):
+                failed.append(key)
+        return failed
+
+    def _signature(self, method, key, content_type, size, expires):
+        message = "\n".join([method, key, content_type, str(size), str(expires)])
+        return hmac.new(self.secret.encode("utf-8"), message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def presigned_put(self, key, content_type, size, expires_in=3600):
+        """Same contract as S3Storage.presigned_put, served by app.files."""
+        expires = int(time.time()) + expires_in
+        query = urlencode({
+            "content_type": content_type,
+            "size": size,
+            "expires": expires,
+            "signature": self._signature("PUT", key, content_type, size, expires),
+        })
+        return {"method": "PUT", "url": f"{self.public_url(key)}?{query}"}
+
+    def presigned_post(self, key, content_type, max_bytes, expires_in=3600):
+        """Same contract as S3Storage.presigned_post, served by app.files."""
+        expires = int(time.time()) + expires_in
+        fields = {
+            "key": key,
+            "Content-Type": content_type,
+            "max_bytes": str(max_bytes),
+            "expires": str(expires),
+            "signature": self._signature("POST", key, content_type, max_bytes, expires),
+        }
+        return {"method": "POST", "url": f"{self.base_url}/", "fields": fields}
+
+    def check_signed_upload(self, method, key, content_type, size, expires, signature):
+        """Raises ValueError unless the parameters are the ones presigned_put/presigned_post signed."""
+        expected = self._signature(method, key, content_type, size, expires)
+        if not hmac.compare_digest(expected, signature or ""):
+            raise ValueError("Invalid upload signature")
+        if int(expires) < time.time():
+            raise ValueError("Upload URL has expired")
+
+
+def _create_backend():
+    if STORAGE_BACKEND == "local":
+        return LocalStorage(LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL, LOCAL_STORAGE_SECRET)
+    return S3Storage(s3_client, S3_BUCKET, AWS_REGION)
+
+backend = _create_backend()
+
+def public_url(object_name):
+    return backend.public_url(object_name)
+
+def key_from_url(url):
+    return backend.key_from_url(url)
+
+def open_object(object_name):
+    return backend.open(object_name)
+
+def presigned_upload(object_name, content_type, size, method="put", expires_in=3600):
+    """
+    Signs a direct-to-storage upload of `object_name` with this content type:
+    a PUT URL for exactly `size` bytes, or a POST policy for at most `size` bytes.
+    The storage service enforces both limits, not just the declared size.
+    """
+    try:
+        if method == "post":
+            return backend.presigned_post(object_name, content_type, size, expires_in=expires_in)
+        return backend.presigned_put(object_name, content_type, size, expires_in=expires_in)
+    except NoCredentialsError:
+        raise HTTPException(status_code=500, detail="AWS credentials not available.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate presigned URL: {e}")
+
+class UploadStats:
+    """Per-process upload counters and the latencies of the most recent uploads."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._counters = {"uploads": 0, "failures": 0, "retries": 0, "bytes": 0}
+
+    def record(self, seconds, size, attempts, ok):
+        with self._lock:
+            self._counters["uploads" if ok else "failures"] += 1
+            self._counters["retries"] += attempts - 1
+            if ok:
+                self._counters["bytes"] += size
+                self._latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = sorted(self._latencies)
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+        stats.update(latency_ms_p50=percentile(0.5), latency_ms_p95=percentile(0.95), latency_ms_max=percentile(1.0))
+        return stats
+
+
+upload_stats = UploadStats()
+_upload_executor = ThreadPoolExecutor(max_workers=STORAGE_UPLOAD_WORKERS, thread_name_prefix="storage-upload")
+
+
+def _is_retryable(error):
+    # Missing credentials and invalid keys fail the same way every time
+    return not isinstance(error, (NoCredentialsError, ValueError))
+
+
+def _upload_with_retries(fileobj, object_name, content_type):
+    start_position = fileobj.tell()
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell() - start_position
+    started = time.monotonic()
+    attempt = 1
+    while True:
+        fileobj.seek(start_position)
+        try:
+            url = backend.upload_fileobj(fileobj, object_name, content_type=content_type)
+            upload_stats.record(time.monotonic() - started, size, attempt, ok=True)
+            return url
+        except Exception as e:
+            if attempt >= STORAGE_UPLOAD_ATTEMPTS or not _is_retryable(e):
+                upload_stats.record(time.monotonic() - started, size, attempt, ok=False)
+                raise
+            delay = backoff_delay(attempt, STORAGE_RETRY_BACKOFF_BASE, STORAGE_RETRY_BACKOFF_MAX)
+            print(f"Upload of {object_name} failed (attempt {attempt}): {e}; retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def submit_upload(fileobj, object_name, content_type=None):
+    """
+    Queues an upload on the storage thread pool and returns its Future.
+    `fileobj` must be seekable (it is rewound for every retry) and stay
+    open until the Future is done.
+    """
+    return _upload_executor.submit(_upload_with_retries, fileobj, object_name, content_type)
+
+
+def upload_fileobj(fileobj, object_name, content_type=None):
+    """
+    Streams a binary file object to storage (multipart for large S3 objects),
+    retrying transient failures, and returns its public URL.
+    """
+    try:
+        return submit_upload(fileobj, object_name, content_type).result(timeout=STORAGE_UPLOAD_TIMEOUT)
+    except NoCredentialsError:
+        raise HTTPException(status_code=500, detail="AWS credentials not available.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to upload to S3: {e}")
+
+
+def shutdown():
+    _upload_executor.shutdown(wait=True)
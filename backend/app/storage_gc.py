@@ -0,0 +1,131 @@
+"""
+Garbage collection of storage objects that no database row references.
+
+Run from the backend directory, e.g. nightly from cron:
+
+    python -m app.storage_gc --dry-run          # only report what would be deleted
+    python -m app.storage_gc --grace-hours 72
+
+Objects under the collected prefixes are listed a page at a time first, then
+the live keys are read from the database (report PDFs, every storage URL
+inside form_data, withdrawal invoices). Listed objects that are not live and
+older than the grace period are deleted in batches. The grace period protects
+uploads whose row is not committed yet, e.g. a PDF mid-render or photos of a
+form still being filled in.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from app import models, storage
+from app.utils import load_form_data
+
+DEFAULT_PREFIXES = ["reports/", "images/"]
+DELETE_BATCH_SIZE = 1000  # the S3 DeleteObjects limit
+
+
+def _collect_keys(value, keys):
+    if isinstance(value, str):
+        key = storage.key_from_url(value)
+        if key:
+            keys.add(key)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_keys(item, keys)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_keys(item, keys)
+
+
+def live_keys(db):
+    """Every storage key referenced from the database."""
+    keys = set()
+    for pdf_url, form_data in db.query(models.Report.pdf_url, models.Report.form_data).yield_per(1000):
+        _collect_keys(pdf_url, keys)
+        _collect_keys(load_form_data(form_data), keys)
+    invoices = db.query(models.WithdrawReward.invoice_pdf).filter(models.WithdrawReward.invoice_pdf.isnot(None))
+    for (invoice_pdf,) in invoices.yield_per(1000):
+        _collect_keys(invoice_pdf, keys)
+    return keys
+
+
+def _as_utc(value):
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def run(args):
+    from app.database import SessionLocal
+
+    started = time.monotonic()
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=args.grace_hours)
+    totals = {"scanned": 0, "scanned_bytes": 0, "too_recent": 0, "live": 0, "orphaned": 0,
+              "deleted": 0, "failed": 0, "bytes_reclaimed": 0}
+
+    candidates = []
+    for prefix in args.prefix:
+        for key, size, last_modified in storage.backend.list_objects(prefix):
+            totals["scanned"] += 1
+            totals["scanned_bytes"] += size
+            if _as_utc(last_modified) > cutoff:
+                totals["too_recent"] += 1
+            else:
+                candidates.append((key, size))
+
+    # Read after listing: a reference committed while the bucket was being
+    # listed is still seen here
+    db = SessionLocal()
+    try:
+        live = live_keys(db)
+    finally:
+        db.close()
+
+    orphans = []
+    for key, size in candidates:
+        if key in live:
+            totals["live"] += 1
+        else:
+            orphans.append((key, size))
+    totals["orphaned"] = len(orphans)
+
+    too_many = totals["scanned"] and len(orphans) > args.max_delete_fraction * totals["scanned"]
+    if too_many and not args.force and not args.dry_run:
+        sys.exit(f"Refusing to delete {len(orphans)} of {totals['scanned']} objects "
+                 f"(more than {args.max_delete_fraction:.0%}); check DATABASE_URL/S3_BUCKET_NAME or pass --force")
+
+    if not args.dry_run:
+        for i in range(0, len(orphans), DELETE_BATCH_SIZE):
+            batch = orphans[i:i + DELETE_BATCH_SIZE]
+            failed = set(storage.backend.delete_objects([key for key, _ in batch]))
+            for key, size in batch:
+                if key in failed:
+                    totals["failed"] += 1
+                    print(f"Could not delete {key}")
+                else:
+                    totals["deleted"] += 1
+                    totals["bytes_reclaimed"] += size
+            print(f"{totals['deleted']} of {len(orphans)} orphaned objects deleted")
+
+    summary = dict(totals)
+    summary["would_reclaim_bytes"] = sum(size for _, size in orphans)
+    summary["elapsed_seconds"] = round(time.monotonic() - started, 2)
+    summary["dry_run"] = args.dry_run
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Delete storage objects that no database row references.")
+    parser.add_argument("--prefix", action="append", help=f"key prefix to collect (repeatable, default {DEFAULT_PREFIXES})")
+    parser.add_argument("--grace-hours", type=float, default=72, help="never delete objects younger than this")
+    parser.add_argument("--max-delete-fraction", type=float, default=0.5,
+                        help="abort if more than this share of the listed objects would be deleted")
+    parser.add_argument("--force", action="store_true", help="delete even above --max-delete-fraction")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    args = parser.parse_args(argv)
+    args.prefix = args.prefix or DEFAULT_PREFIXES
+    return args
+
+
+if __name__ == "__main__":
+    run(parse_args())
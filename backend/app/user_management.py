@@ -153,11 +153,13 @@ def update_user(user_id: UUID, user_update_data: UserUpdate, db: Session = Depen
     if 'password' in update_data:
         update_data['hashed_password'] = get_password_hash(update_data.pop('password'))
 
+    old_email = db_user.email
     for key, value in update_data.items():
         setattr(db_user, key, value)
     
     db.commit()
     db.refresh(db_user)
+    auth.invalidate_principal(old_email, db_user.email)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['update'], target_type=constants.targetTypes['user'], target_id=user_id)
     
     user_type_str = db.query(models.UserType.type).filter(models.UserType.id == db_user.user_type_id).scalar()
@@ -189,11 +191,13 @@ def update_user_admin(user_id: UUID, user_update_data: AdminUserUpdate, db: Sess
     if 'password' in update_data:
         update_data['hashed_password'] = get_password_hash(update_data.pop('password'))
 
+    old_email = db_user.email
     for key, value in update_data.items():
         setattr(db_user, key, value)
     
     db.commit()
     db.refresh(db_user)
+    auth.invalidate_principal(old_email, db_user.email)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['update'], target_type=constants.targetTypes['user'], target_id=user_id)
     
     user_type_str = db.query(models.UserType.type).filter(models.UserType.id == db_user.user_type_id).scalar()
@@ -216,8 +220,10 @@ def delete_user(user_id: UUID, db: Session = Depends(database.get_db), current_u
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    email = db_user.email
     db.delete(db_user)
     db.commit()
+    auth.invalidate_principal(email)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['delete'], target_type=constants.targetTypes['user'], target_id=user_id)
     return {"detail": "User deleted"}
 
@@ -236,6 +242,7 @@ def set_affiliate_status(user_id: UUID, request: SetAffiliateStatusRequest, db:
     user_to_update.is_affiliate = request.is_affiliate
     db.commit()
     db.refresh(user_to_update)
+    auth.invalidate_principal(user_to_update.email)
     log_audit(db, user_id=current_user.id, action=constants.actionTypes['set_affiliate'], target_type=constants.targetTypes['user'], target_id=user_id)
     
     return {"message": f"User {user_to_update.username}'s affiliate status set to {request.is_affiliate}"}
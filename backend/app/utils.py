@@ -1,4 +1,7 @@
+import json
+import random
 from passlib.context import CryptContext
+from sqlalchemy.dialects import postgresql, sqlite
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -8,7 +11,8 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def log_audit(db, user_id, action, target_type=None, target_id=None):
+def log_audit(db, user_id, action, target_type=None, target_id=None, commit=True):
+    """Records an audit entry. Pass commit=False to leave it in the caller's transaction."""
     from app import models
     from datetime import datetime
     log = models.AuditLog(
@@ -19,4 +23,26 @@ def log_audit(db, user_id, action, target_type=None, target_id=None):
         timestamp=datetime.utcnow()
     )
     db.add(log)
-    db.commit() 
\ No newline at end of file
+    if commit:
+        db.commit()
+
+def load_form_data(value):
+    """
+    Returns Report.form_data as a dict. Rows written before form_data became
+    native JSON hold a JSON-encoded string instead; those are decoded here.
+    """
+    if value is None or isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        return json.loads(value) if value else None
+    return value
+
+def upsert(db, table):
+    """INSERT for `table` with ON CONFLICT support (on_conflict_do_update) on the session's dialect."""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+def backoff_delay(attempt, base, maximum):
+    """Seconds to wait before retry number `attempt` (from 1): exponential backoff with full jitter, capped at `maximum`."""
+    return random.uniform(0, min(maximum, base * (2 ** (attempt - 1))))
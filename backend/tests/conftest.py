@@ -0,0 +1,21 @@
+"""
+Points the app at a throwaway SQLite file (or TEST_DATABASE_URL, e.g. a test
+Postgres database) before any test module imports it.
+Run from the backend directory: python -m pytest
+"""
+import os
+import tempfile
+
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+)
+
+import pytest
+from app import database
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal.session_factory()
+    yield session
+    session.close()
@@ -0,0 +1,155 @@
+"""
+Parallel approvals must credit each reward exactly once.
+"""
+import threading
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from app import models, database, reports, constants
+
+THREADS = 8
+REWARD = 5
+
+
+@pytest.fixture
+def users(db):
+    for type_id, name in ((constants.ADMIN, "admin"), (constants.AGENT, "agent"), (3, "user")):
+        if db.get(models.UserType, type_id) is None:
+            db.add(models.UserType(id=type_id, type=name))
+    if db.get(models.ReportType, 1) is None:
+        db.add(models.ReportType(id=1, type="smoke"))
+    suffix = uuid.uuid4().hex[:8]
+    admin = models.User(username=f"admin-{suffix}", email=f"admin-{suffix}@example.com",
+                        hashed_password="x", user_type_id=constants.ADMIN)
+    agent = models.User(username=f"agent-{suffix}", email=f"agent-{suffix}@example.com",
+                        hashed_password="x", user_type_id=constants.AGENT, is_affiliate=True)
+    db.add_all([admin, agent])
+    db.commit()
+    return admin.id, agent.id
+
+
+def make_report(db, agent_id):
+    address = models.Address(address=f"{uuid.uuid4().hex[:6]} Test Street")
+    db.add(address)
+    db.flush()
+    report = models.Report(address_id=address.id, publisher_id=agent_id, agent_id=agent_id, report_type_id=1,
+                           status="pending", created_date=datetime.utcnow(), form_data={})
+    db.add(report)
+    db.commit()
+    return report.id
+
+
+def approve(admin_id, report_id):
+    """approve_report in its own session, as a request would; returns the status code."""
+    db = database.SessionLocal.session_factory()
+    try:
+        admin = db.get(models.User, admin_id)
+        reports.approve_report(report_id, reports.ApproveReportRequest(comment=None, reward=REWARD),
+                               db=db, current_user=admin)
+        return 200
+    except HTTPException as e:
+        return e.status_code
+    finally:
+        db.close()
+
+
+def bulk_approve(admin_id, report_id):
+    """bulk_review_reports with a single approval, in its own session; returns 200 or 409 like approve()."""
+    db = database.SessionLocal.session_factory()
+    try:
+        admin = db.get(models.User, admin_id)
+        request_data = reports.BulkReviewRequest(items=[
+            reports.BulkReviewItem(report_id=report_id, action="approve", reward=REWARD)
+        ])
+        result = reports.bulk_review_reports(request_data, db=db, current_user=admin).results[0]
+        return 200 if result.ok else 409
+    finally:
+        db.close()
+
+
+def approve_in_parallel(admin_id, report_ids, approve_fns=None):
+    approve_fns = approve_fns or [approve] * len(report_ids)
+    results = [None] * len(report_ids)
+    barrier = threading.Barrier(len(report_ids))
+
+    def run(i):
+        barrier.wait()
+        results[i] = approve_fns[i](admin_id, report_ids[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(report_ids))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def balance(db, agent_id):
+    row = db.query(models.AgentBalance).filter(models.AgentBalance.agent_id == agent_id).first()
+    return row.balance if row else Decimal(0)
+
+
+def approvals_logged(db, report_id):
+    return db.query(models.AuditLog).filter(
+        models.AuditLog.target_id == report_id,
+        models.AuditLog.action == constants.actionTypes['approve']
+    ).count()
+
+
+def test_parallel_approvals_of_one_report_credit_once(db, users):
+    admin_id, agent_id = users
+    report_id = make_report(db, agent_id)
+
+    results = approve_in_parallel(admin_id, [report_id] * THREADS)
+
+    assert sorted(results) == [200] + [409] * (THREADS - 1)
+    db.expire_all()
+    assert balance(db, agent_id) == REWARD
+    assert approvals_logged(db, report_id) == 1
+    report = db.get(models.Report, report_id)
+    rows = db.query(models.AddressReport).filter(models.AddressReport.address_id == report.address_id).all()
+    assert [(r.last_report_id, r.last_inspect_type_id) for r in rows] == [(report_id, 1)]
+
+
+def test_bulk_and_single_approvals_of_one_report_credit_once(db, users):
+    admin_id, agent_id = users
+    report_id = make_report(db, agent_id)
+
+    results = approve_in_parallel(admin_id, [report_id] * THREADS, [approve, bulk_approve] * (THREADS // 2))
+
+    assert sorted(results) == [200] + [409] * (THREADS - 1)
+    db.expire_all()
+    assert balance(db, agent_id) == REWARD
+    assert approvals_logged(db, report_id) == 1
+
+
+def test_parallel_approvals_of_many_reports_all_credit(db, users):
+    admin_id, agent_id = users
+    report_ids = [make_report(db, agent_id) for _ in range(THREADS)]
+
+    results = approve_in_parallel(admin_id, report_ids)
+
+    assert results == [200] * THREADS
+    db.expire_all()
+    assert balance(db, agent_id) == REWARD * THREADS
+    for report_id in report_ids:
+        assert approvals_logged(db, report_id) == 1
+        report = db.get(models.Report, report_id)
+        assert report.status == "approved"
+        row = db.query(models.AddressReport).filter(models.AddressReport.address_id == report.address_id).one()
+        assert row.last_report_id == report_id
+
+
+def test_approving_twice_is_rejected(db, users):
+    admin_id, agent_id = users
+    report_id = make_report(db, agent_id)
+
+    assert approve(admin_id, report_id) == 200
+    assert approve(admin_id, report_id) == 409
+
+    db.expire_all()
+    assert balance(db, agent_id) == REWARD
+    assert approvals_logged(db, report_id) == 1
@@ -0,0 +1,48 @@
+"""
+Retrying a render job after a failed upload must not render the PDF again.
+"""
+from io import BytesIO
+
+import pytest
+from app import render_engine, render_jobs, storage
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = {"render": 0, "upload": [], "fail_uploads": 1}
+
+    def render_pdf(form_data, report_type_id):
+        calls["render"] += 1
+        return BytesIO(b"%PDF " + str(form_data).encode())
+
+    def upload_fileobj(fileobj, object_name, content_type=None):
+        calls["upload"].append(fileobj.read())
+        if calls["fail_uploads"]:
+            calls["fail_uploads"] -= 1
+            raise RuntimeError("storage unavailable")
+        return f"https://storage/{object_name}"
+
+    monkeypatch.setattr(render_engine, "render_pdf", render_pdf)
+    monkeypatch.setattr(storage, "upload_fileobj", upload_fileobj)
+    monkeypatch.setattr(render_jobs, "_rendered", {})
+    return calls
+
+
+def test_retry_after_failed_upload_only_uploads(calls):
+    with pytest.raises(RuntimeError):
+        render_jobs._render_and_upload(1, {"a": 1}, 1, "hash-a")
+
+    assert render_jobs._render_and_upload(1, {"a": 1}, 1, "hash-a") == "https://storage/reports/hash-a.pdf"
+    assert calls["render"] == 1
+    assert calls["upload"] == [b"%PDF {'a': 1}"] * 2
+    assert render_jobs._rendered == {}
+
+
+def test_changed_form_is_rendered_again(calls):
+    with pytest.raises(RuntimeError):
+        render_jobs._render_and_upload(1, {"a": 1}, 1, "hash-a")
+
+    render_jobs._render_and_upload(1, {"a": 2}, 1, "hash-b")
+    assert calls["render"] == 2
+    assert calls["upload"][-1] == b"%PDF {'a': 2}"
+    assert render_jobs._rendered == {}
@@ -0,0 +1,110 @@
+"""
+storage_gc against LocalStorage as the S3 stand-in and the test database.
+"""
+import os
+import time
+import uuid
+from datetime import datetime
+from io import BytesIO
+
+import pytest
+from app import models, storage, storage_gc
+
+OLD = time.time() - 100 * 3600  # older than the default 72h grace period
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    local = storage.LocalStorage(str(tmp_path), "http://testserver/files", "secret")
+    monkeypatch.setattr(storage, "backend", local)
+    return local
+
+
+def put(backend, key, body=b"x" * 10, mtime=OLD):
+    backend.upload_fileobj(BytesIO(body), key)
+    os.utime(backend.file_path(key), (mtime, mtime))
+
+
+def keys(backend):
+    return {key for key, _, _ in backend.list_objects("")}
+
+
+@pytest.fixture
+def objects(backend, db):
+    """Three referenced objects, two old orphans and one fresh orphan under a unique prefix."""
+    run = uuid.uuid4().hex[:8]
+    live = {
+        "pdf": f"reports/{run}-report.pdf",
+        "photo": f"images/{run}-photo",
+        "invoice": f"reports/{run}-invoice.pdf",
+    }
+    orphans = {f"images/{run}-orphan", f"reports/{run}-orphan.pdf"}
+    fresh = f"images/{run}-fresh"
+    for key in live.values():
+        put(backend, key)
+    for key in orphans:
+        put(backend, key, body=b"y" * 100)
+    put(backend, fresh, mtime=time.time())
+
+    agent = models.User(username=f"gc-{run}", email=f"gc-{run}@example.com", hashed_password="x", user_type_id=2)
+    db.add(agent)
+    db.flush()
+    db.add(models.Report(
+        publisher_id=agent.id,
+        created_date=datetime.utcnow(),
+        pdf_url=backend.public_url(live["pdf"]),
+        # Photo URLs sit deep inside the form
+        form_data={"sections": [{"name": "kitchen", "photos": [{"url": backend.public_url(live["photo"])}]}]}
+    ))
+    db.add(models.WithdrawReward(agent_id=agent.id, amount=10, invoice_pdf=backend.public_url(live["invoice"])))
+    db.commit()
+    return set(live.values()), orphans, fresh
+
+
+def test_deletes_only_old_unreferenced_objects(backend, objects):
+    live, orphans, fresh = objects
+
+    summary = storage_gc.run(storage_gc.parse_args([]))
+
+    assert keys(backend) == live | {fresh}
+    assert summary["scanned"] == 6
+    assert summary["too_recent"] == 1
+    assert summary["live"] == 3
+    assert summary["orphaned"] == summary["deleted"] == 2
+    assert summary["bytes_reclaimed"] == 200
+    assert summary["failed"] == 0
+
+
+def test_dry_run_deletes_nothing(backend, objects):
+    live, orphans, fresh = objects
+
+    summary = storage_gc.run(storage_gc.parse_args(["--dry-run"]))
+
+    assert keys(backend) == live | orphans | {fresh}
+    assert summary["deleted"] == 0
+    assert summary["would_reclaim_bytes"] == 200
+
+
+def test_grace_period_keeps_younger_objects(backend, objects):
+    live, orphans, fresh = objects
+    recent = time.time() - 10 * 3600
+    for key in orphans:
+        os.utime(backend.file_path(key), (recent, recent))
+
+    summary = storage_gc.run(storage_gc.parse_args(["--grace-hours", "24"]))
+
+    assert keys(backend) == live | orphans | {fresh}
+    assert summary["too_recent"] == 3
+    assert summary["deleted"] == 0
+
+
+def test_max_delete_fraction_aborts_without_force(backend, objects):
+    live, orphans, fresh = objects
+
+    with pytest.raises(SystemExit):
+        storage_gc.run(storage_gc.parse_args(["--max-delete-fraction", "0.2"]))
+    assert keys(backend) == live | orphans | {fresh}
+
+    summary = storage_gc.run(storage_gc.parse_args(["--max-delete-fraction", "0.2", "--force"]))
+    assert keys(backend) == live | {fresh}
+    assert summary["deleted"] == 2